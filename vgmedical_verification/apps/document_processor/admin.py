@@ -1,9 +1,34 @@
+import re
+
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db.models import Count
 from django.utils.html import format_html
+from django.utils.safestring import mark_safe
 from .models import (
     SurgicalCase, Document, Supply, SupplyEquivalence, VerificationResult
 )
 
+User = get_user_model()
+
+# Formato generado por DocumentProcessor._generate_case_number
+CASE_NUMBER_PATTERN = re.compile(r'VG_\d{8}_\d{6}_[0-9a-f]{8}', re.IGNORECASE)
+
+
+class LightweightForeignKeyMixin:
+    """Limita las columnas cargadas en los desplegables de llaves foráneas"""
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'surgical_case':
+            kwargs['queryset'] = SurgicalCase.objects.only('id', 'case_number', 'patient_name')
+        elif db_field.name == 'document':
+            kwargs['queryset'] = Document.objects.select_related('surgical_case').only(
+                'id', 'document_type', 'surgical_case__case_number'
+            )
+        elif db_field.name in ('validated_by', 'feedback_by'):
+            kwargs['queryset'] = User.objects.only('id', 'full_name', 'email')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
 
 @admin.register(SurgicalCase)
 class SurgicalCaseAdmin(admin.ModelAdmin):
@@ -13,56 +38,78 @@ class SurgicalCaseAdmin(admin.ModelAdmin):
     ]
     list_filter = ['surgery_date', 'city', 'created']
     search_fields = ['case_number', 'patient_name', 'patient_id', 'doctor_name']
+    list_select_related = ['verification']
+    list_per_page = 50
     readonly_fields = ['case_number', 'created', 'modified']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('verification').defer('procedure')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Un número de caso completo se resuelve por igualdad con el índice único
+        term = search_term.strip()
+        if CASE_NUMBER_PATTERN.fullmatch(term):
+            return queryset.filter(case_number=term), False
+        return super().get_search_results(request, queryset, search_term)
+
+    # HTML estático por estado; evita format_html en cada fila del changelist
+    _STATUS_HTML = {
+        'approved': mark_safe('<span style="color: green;">✅ APROBADO</span>'),
+        'review': mark_safe('<span style="color: orange;">⚠️ REVISIÓN</span>'),
+        'rejected': mark_safe('<span style="color: red;">❌ RECHAZADO</span>'),
+        'unverified': mark_safe('<span style="color: gray;">Sin verificar</span>'),
+    }
+
     def verification_status(self, obj):
         try:
             verification = obj.verification
-            if verification.verification_score >= 85:
-                color = 'green'
-                status = '✅ APROBADO'
-            elif verification.requires_review:
-                color = 'orange'
-                status = '⚠️ REVISIÓN'
-            else:
-                color = 'red'
-                status = '❌ RECHAZADO'
-
-            return format_html(
-                '<span style="color: {};">{}</span>',
-                color, status
-            )
-        except:
-            return format_html('<span style="color: gray;">Sin verificar</span>')
+        except VerificationResult.DoesNotExist:
+            return self._STATUS_HTML['unverified']
+
+        if verification.verification_score >= 85:
+            return self._STATUS_HTML['approved']
+        if verification.requires_review:
+            return self._STATUS_HTML['review']
+        return self._STATUS_HTML['rejected']
 
     verification_status.short_description = 'Estado Verificación'
 
 
 @admin.register(Document)
-class DocumentAdmin(admin.ModelAdmin):
+class DocumentAdmin(LightweightForeignKeyMixin, admin.ModelAdmin):
     list_display = [
         'surgical_case', 'document_type', 'status',
         'supplies_count', 'processed_at'
     ]
     list_filter = ['document_type', 'status', 'processed_at']
+    list_select_related = ['surgical_case']
+    list_per_page = 50
     readonly_fields = [
         'extracted_text', 'processed_at', 'processing_error',
         'created', 'modified'
     ]
 
+    def get_queryset(self, request):
+        qs = super().get_queryset(request).select_related('surgical_case').annotate(
+            _supplies_count=Count('supplies')
+        )
+        return qs.defer('extracted_text', 'processing_error', 'extracted_procedure')
+
     def supplies_count(self, obj):
-        return obj.supplies.count()
+        return obj._supplies_count
 
     supplies_count.short_description = 'Insumos'
+    supplies_count.admin_order_field = '_supplies_count'
 
 
 @admin.register(Supply)
-class SupplyAdmin(admin.ModelAdmin):
+class SupplyAdmin(LightweightForeignKeyMixin, admin.ModelAdmin):
     list_display = [
         'name', 'quantity', 'document_type', 'ref_code',
         'lot_code', 'udi_label_present'
     ]
     list_filter = ['document__document_type', 'udi_label_present']
+    list_select_related = ['document', 'document__surgical_case']
     search_fields = ['name', 'ref_code', 'lot_code']
 
     def document_type(self, obj):
@@ -72,7 +119,7 @@ class SupplyAdmin(admin.ModelAdmin):
 
 
 @admin.register(SupplyEquivalence)
-class SupplyEquivalenceAdmin(admin.ModelAdmin):
+class SupplyEquivalenceAdmin(LightweightForeignKeyMixin, admin.ModelAdmin):
     list_display = [
         'canonical_name', 'aliases_count', 'confidence_score',
         'times_used', 'is_auto_generated'
@@ -88,32 +135,40 @@ class SupplyEquivalenceAdmin(admin.ModelAdmin):
 
 
 @admin.register(VerificationResult)
-class VerificationResultAdmin(admin.ModelAdmin):
+class VerificationResultAdmin(LightweightForeignKeyMixin, admin.ModelAdmin):
     list_display = [
         'surgical_case', 'verification_score', 'overall_status',
         'basic_data_match', 'supplies_match', 'traceability_complete',
         'processing_time'
     ]
     list_filter = [
-        'basic_data_match', 'supplies_match', 'traceability_complete',
+        'overall_status', 'basic_data_match', 'supplies_match', 'traceability_complete',
         'requires_review'
     ]
+    list_select_related = ['surgical_case']
     readonly_fields = [
         'basic_data_details', 'supplies_details', 'traceability_details',
         'discrepancies', 'processed_at', 'processing_time'
     ]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('surgical_case')
+
+    _STATUS_HTML = {
+        status: mark_safe(f'<span style="color: {color}; font-weight: bold;">{status}</span>')
+        for status, color in (
+            ('APROBADO', 'green'),
+            ('REQUIERE_REVISION', 'orange'),
+            ('RECHAZADO', 'red'),
+        )
+    }
+
     def overall_status(self, obj):
         status = obj.overall_status
-        color_map = {
-            'APROBADO': 'green',
-            'REQUIERE_REVISION': 'orange',
-            'RECHAZADO': 'red'
-        }
-
-        return format_html(
-            '<span style="color: {}; font-weight: bold;">{}</span>',
-            color_map.get(status, 'gray'), status
-        )
+        html = self._STATUS_HTML.get(status)
+        if html is None:
+            html = format_html('<span style="color: gray; font-weight: bold;">{}</span>', status)
+        return html
 
     overall_status.short_description = 'Estado General'
+    overall_status.admin_order_field = 'overall_status'
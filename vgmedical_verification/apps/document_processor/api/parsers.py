@@ -0,0 +1,14 @@
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework.parsers import MultiPartParser
+
+
+class TemporaryFileMultiPartParser(MultiPartParser):
+    """
+    MultiPartParser que escribe los archivos subidos directamente a disco
+    (TemporaryUploadedFile) en lugar de mantenerlos en memoria.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        request.upload_handlers = [TemporaryFileUploadHandler(request._request)]
+        return super().parse(stream, media_type=media_type, parser_context=parser_context)
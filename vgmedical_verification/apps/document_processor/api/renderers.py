@@ -0,0 +1,22 @@
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Renderer JSON basado en orjson para payloads grandes (reportes, sugerencias).
+    Los tipos que orjson no soporta (Decimal, lazy strings...) se delegan
+    al encoder de DRF.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    options = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+
+    _default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=self._default, option=self.options)
@@ -1,6 +1,10 @@
+import json
+
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
+from vgmedical_verification.apps.document_processor.api.validators import run_rules
+
 User = get_user_model()
 
 
@@ -20,15 +24,20 @@ class CaseIngestSerializer(serializers.Serializer):
     case_data = serializers.JSONField(required=False)
 
     def validate(self, attrs):
-        # Validación simple de tamaños/MIME opcional (placeholder)
-        # Ejemplo: limitar a 10MB por archivo
-        max_size = 10 * 1024 * 1024
-        for key in ('internal', 'hospital', 'description'):
-            f = attrs.get(key)
-            if not f:
-                raise serializers.ValidationError({key: "Archivo requerido"})
-            if getattr(f, 'size', 0) > max_size:
-                raise serializers.ValidationError({key: "Archivo supera 10MB"})
+        # `case_data` puede venir como dict (JSONField) o como string JSON
+        case_data = attrs.get('case_data')
+        if isinstance(case_data, str):
+            try:
+                case_data = json.loads(case_data)
+            except ValueError:
+                case_data = None
+        attrs['case_data'] = case_data if isinstance(case_data, dict) else None
+
+        # Reporta todos los errores de la ingesta en una sola respuesta
+        errors, warnings = run_rules(attrs)
+        if errors:
+            raise serializers.ValidationError(errors)
+        attrs['warnings'] = warnings
         return attrs
 
 class EquivalenceCreateSerializer(serializers.Serializer):
@@ -0,0 +1,68 @@
+"""
+Reglas de validación de la ingesta de casos.
+
+Cada regla es una tupla (condition, error_key, error_msg, severity) donde
+`condition(attrs)` retorna True si la regla se cumple. Las reglas se evalúan
+una sola vez por request, en orden; una regla FATAL que falla detiene la
+evaluación de las demás reglas de la misma llave.
+"""
+from django.conf import settings
+
+FATAL = 'fatal'
+WARNING = 'warning'
+
+# Límite de tamaño por archivo subido (10MB)
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+REQUIRED_UPLOADS = ('internal', 'hospital', 'description')
+
+
+def _file_within_size(key):
+    return lambda attrs: attrs[key].size <= MAX_UPLOAD_BYTES
+
+
+def _file_type_allowed(key):
+    return lambda attrs: (
+        attrs[key].name.lower().rsplit('.', 1)[-1] in settings.ALLOWED_DOCUMENT_TYPES
+    )
+
+
+def _patient_id_numeric(attrs):
+    patient_id = (attrs.get('case_data') or {}).get('patient_id')
+    if not patient_id:
+        return True
+    return str(patient_id).replace('.', '').replace('-', '').replace(' ', '').isdigit()
+
+
+INGEST_RULES = [
+    *(
+        rule
+        for key in REQUIRED_UPLOADS
+        for rule in (
+            (_file_within_size(key), key, "Archivo supera 10MB", FATAL),
+            (_file_type_allowed(key), key, "Tipo de archivo no soportado", FATAL),
+        )
+    ),
+    (_patient_id_numeric, 'case_data', "La identificación del paciente no es numérica", WARNING),
+]
+
+
+def run_rules(attrs, rules=INGEST_RULES):
+    """
+    Evalúa las reglas sobre `attrs`
+
+    Returns:
+        Tuple (errors, warnings): errors es un dict {llave: mensaje} con los
+        errores FATAL, warnings una lista de mensajes
+    """
+    errors = {}
+    warnings = []
+    for condition, error_key, error_msg, severity in rules:
+        if error_key in errors:
+            continue
+        if condition(attrs):
+            continue
+        if severity == FATAL:
+            errors[error_key] = error_msg
+        else:
+            warnings.append(error_msg)
+    return errors, warnings
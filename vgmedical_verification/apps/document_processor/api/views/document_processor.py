@@ -1,115 +1,147 @@
-import json
 from typing import Dict
 
+from django.db import transaction
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from rest_framework import status
-from rest_framework.decorators import api_view, parser_classes, permission_classes
-from rest_framework.parsers import MultiPartParser, JSONParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from vgmedical_verification.apps.document_processor.api.parsers import TemporaryFileMultiPartParser
 from vgmedical_verification.apps.document_processor.api.serializers.document_processor import CaseIngestSerializer, \
     EquivalenceCreateSerializer
 from vgmedical_verification.apps.document_processor.services.services import (
-    process_surgical_case_files,
+    register_surgical_case_files,
     generate_case_report,
+    get_case_report_version,
+    get_cached_case_report,
     suggest_supply_equivalences,
     EquivalenceManager,
     DocumentProcessingError,
 )
+from vgmedical_verification.apps.document_processor.tasks import process_case_task
 
 
-@api_view(['POST'])
-@parser_classes([MultiPartParser, JSONParser])
-@permission_classes([IsAuthenticated])
-def ingest_case_view(request):
+class IngestCaseView(APIView):
     """
-    Ingesta los 3 documentos (interno, hospital, descripción) y procesa el caso completo.
+    Ingesta los 3 documentos (interno, hospital, descripción) y encola el
+    procesamiento del caso. El resultado se consulta en el reporte del caso.
     Request (multipart/form-data):
       - internal: file
       - hospital: file
       - description: file
       - case_data: (JSON) opcional con campos básicos
     """
-    serializer = CaseIngestSerializer(data=request.data)
-    serializer.is_valid(raise_exception=True)
-    v = serializer.validated_data
-
-    files_dict: Dict = {
-        'internal': v['internal'],
-        'hospital': v['hospital'],
-        'description': v['description'],
-    }
-
-    # `case_data` puede venir como dict (JSONField) o como string JSON
-    case_data = v.get('case_data')
-    if isinstance(case_data, str):
+    # Endpoint siempre multipart: no se negocia JSONParser
+    parser_classes = (TemporaryFileMultiPartParser,)
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        serializer = CaseIngestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        v = serializer.validated_data
+
+        files_dict: Dict = {
+            'internal': v['internal'],
+            'hospital': v['hospital'],
+            'description': v['description'],
+        }
+
+        if v['case_data']:
+            files_dict['case_data'] = v['case_data']
+
         try:
-            case_data = json.loads(case_data)
-        except Exception:
-            case_data = None
-    if isinstance(case_data, dict):
-        files_dict['case_data'] = case_data
-
-    try:
-        case = process_surgical_case_files(files_dict, request.user)
-    except DocumentProcessingError as e:
-        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
-    return Response({
-        'case_id': str(case.id),
-        'case_number': case.case_number,
-        'status': 'processed'
-    }, status=status.HTTP_201_CREATED)
-
-
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def case_report_view(request, case_id: str):
+            case = register_surgical_case_files(files_dict, request.user)
+        except DocumentProcessingError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Encolar solo cuando el caso y sus archivos estén confirmados en la BD
+        case_id = str(case.id)
+        transaction.on_commit(lambda: process_case_task.delay(case_id))
+
+        return Response({
+            'case_id': case_id,
+            'case_number': case.case_number,
+            'status': 'queued',
+            'warnings': v['warnings'],
+            'status_url': request.build_absolute_uri(
+                reverse('api:document_processor:cases-report', kwargs={'case_id': case.id})
+            ),
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class CaseReportView(APIView):
     """
     Retorna el reporte completo de verificación de un caso.
+    Mientras el caso sigue en cola/procesamiento responde 202.
+    Soporta GET condicional (ETag / Last-Modified) para casos verificados.
     """
-    report = generate_case_report(case_id)
-    if report.get('error'):
-        return Response(report, status=status.HTTP_404_NOT_FOUND)
-    return Response(report, status=status.HTTP_200_OK)
+    permission_classes = (IsAuthenticated,)
 
+    def get(self, request, case_id: str):
+        version = get_case_report_version(case_id)
+        if version is not None:
+            report_version, last_modified = version
+            etag = quote_etag(report_version)
+            last_modified_ts = int(last_modified.timestamp())
 
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def create_equivalence_view(request):
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+            if not_modified is not None:
+                return not_modified
+
+            response = Response(get_cached_case_report(case_id, report_version), status=status.HTTP_200_OK)
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified_ts)
+            return response
+
+        report = generate_case_report(case_id)
+        if report.get('error'):
+            if report.get('status') == 'processing':
+                return Response(report, status=status.HTTP_202_ACCEPTED)
+            return Response(report, status=status.HTTP_404_NOT_FOUND)
+        return Response(report, status=status.HTTP_200_OK)
+
+
+class EquivalenceCreateView(APIView):
     """
     Crea o actualiza una equivalencia de insumos (mecanismo de aprendizaje).
     Body (JSON):
       - canonical_name: str
       - aliases: [str, ...]
     """
-    serializer = EquivalenceCreateSerializer(data=request.data)
-    serializer.is_valid(raise_exception=True)
-    v = serializer.validated_data
-
-    manager = EquivalenceManager()
-    eq = manager.add_equivalence(
-        canonical_name=v['canonical_name'],
-        aliases=v['aliases'],
-        user=request.user,
-        is_auto=False
-    )
-    return Response({
-        'id': str(eq.id),
-        'canonical_name': eq.canonical_name,
-        'aliases': eq.aliases,
-        'confidence_score': eq.confidence_score
-    }, status=status.HTTP_201_CREATED)
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        serializer = EquivalenceCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        v = serializer.validated_data
+
+        manager = EquivalenceManager.instance()
+        eq = manager.add_equivalence(
+            canonical_name=v['canonical_name'],
+            aliases=v['aliases'],
+            user=request.user,
+            is_auto=False
+        )
+        return Response({
+            'id': str(eq.id),
+            'canonical_name': eq.canonical_name,
+            'aliases': eq.aliases,
+            'confidence_score': eq.confidence_score
+        }, status=status.HTTP_201_CREATED)
 
 
 # Opcional: sugerencias automáticas de equivalencias con base al caso ya cargado
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def suggest_equivalences_view(request, case_id: str):
+class SuggestEquivalencesView(APIView):
     """
     Retorna una lista de sugerencias de equivalencias a partir de los insumos del caso.
     """
-    suggestions = suggest_supply_equivalences(case_id)
-    if isinstance(suggestions, dict) and suggestions.get('error'):
-        return Response(suggestions, status=status.HTTP_404_NOT_FOUND)
-    return Response({'suggestions': suggestions}, status=status.HTTP_200_OK)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, case_id: str):
+        suggestions = suggest_supply_equivalences(case_id)
+        if isinstance(suggestions, dict) and suggestions.get('error'):
+            return Response(suggestions, status=status.HTTP_404_NOT_FOUND)
+        return Response({'suggestions': suggestions}, status=status.HTTP_200_OK)
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-15 01:46
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('document_processor', '0002_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['processed_at'], name='document_pr_process_067ccc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['document_type', 'status'], name='document_pr_documen_74e7a3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supply',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='supply_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='supply',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['ref_code'], name='supply_ref_code_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='supply',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['lot_code'], name='supply_lot_code_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='surgicalcase',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['case_number'], name='sc_case_number_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='surgicalcase',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['patient_name'], name='sc_patient_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='surgicalcase',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['patient_id'], name='sc_patient_id_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='surgicalcase',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['doctor_name'], name='sc_doctor_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='surgicalcase',
+            index=models.Index(fields=['surgery_date'], name='document_pr_surgery_fc2ab1_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-15 02:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('document_processor', '0003_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='verificationresult',
+            name='overall_status',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(basic_data_match=True, supplies_match=True, then=models.Value('APROBADO'), traceability_complete=True), models.When(requires_review=True, then=models.Value('REQUIERE_REVISION')), default=models.Value('RECHAZADO')), output_field=models.CharField(max_length=20)),
+        ),
+        migrations.AddIndex(
+            model_name='verificationresult',
+            index=models.Index(fields=['overall_status'], name='document_pr_overall_004935_idx'),
+        ),
+    ]
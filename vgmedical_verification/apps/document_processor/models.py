@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.utils import timezone
+from django.utils.functional import cached_property
 
 from vgmedical_verification.utils.models import BaseModel
 
@@ -31,6 +34,14 @@ class SurgicalCase(BaseModel):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            # Búsquedas del admin (ILIKE '%q%') sobre los campos de search_fields
+            GinIndex(name='sc_case_number_trgm', fields=['case_number'], opclasses=['gin_trgm_ops']),
+            GinIndex(name='sc_patient_name_trgm', fields=['patient_name'], opclasses=['gin_trgm_ops']),
+            GinIndex(name='sc_patient_id_trgm', fields=['patient_id'], opclasses=['gin_trgm_ops']),
+            GinIndex(name='sc_doctor_name_trgm', fields=['doctor_name'], opclasses=['gin_trgm_ops']),
+            models.Index(fields=['surgery_date']),
+        ]
 
     def __str__(self):
         return f"Caso {self.case_number} - {self.patient_name}"
@@ -59,6 +70,10 @@ class Document(BaseModel):
 
     class Meta:
         unique_together = ['surgical_case', 'document_type']
+        indexes = [
+            models.Index(fields=['processed_at']),
+            models.Index(fields=['document_type', 'status']),
+        ]
 
     def __str__(self):
         return f"{self.get_document_type_display()} - {self.surgical_case.case_number}"
@@ -82,6 +97,13 @@ class Supply(BaseModel):
     line_number = models.IntegerField(null=True, blank=True)
     confidence = models.FloatField(default=0.0)  # Confianza del OCR/extracción
 
+    class Meta:
+        indexes = [
+            GinIndex(name='supply_name_trgm', fields=['name'], opclasses=['gin_trgm_ops']),
+            GinIndex(name='supply_ref_code_trgm', fields=['ref_code'], opclasses=['gin_trgm_ops']),
+            GinIndex(name='supply_lot_code_trgm', fields=['lot_code'], opclasses=['gin_trgm_ops']),
+        ]
+
     def __str__(self):
         return f"{self.name} (x{self.quantity})"
 
@@ -103,11 +125,40 @@ class SupplyEquivalence(BaseModel):
     def __str__(self):
         return self.canonical_name
 
+    @cached_property
+    def _lower_aliases(self):
+        return {a.lower() for a in self.aliases}
+
     def add_alias(self, alias):
         """Añade un nuevo sinónimo si no existe"""
-        if alias.lower() not in [a.lower() for a in self.aliases]:
-            self.aliases.append(alias)
-            self.save()
+        self.add_aliases([alias])
+
+    def add_aliases(self, aliases):
+        """Añade los sinónimos que no existan con un único UPDATE"""
+        new_aliases = []
+        for alias in aliases:
+            if alias.lower() not in self._lower_aliases:
+                self._lower_aliases.add(alias.lower())
+                new_aliases.append(alias)
+        if not new_aliases:
+            return
+
+        # Append atómico en la BD (jsonb || jsonb) sin reescribir la fila completa
+        now = timezone.now()
+        SupplyEquivalence.objects.filter(pk=self.pk).update(
+            aliases=models.Func(
+                models.F('aliases'),
+                models.Value(new_aliases, output_field=models.JSONField()),
+                template='%(expressions)s',
+                arg_joiner=' || ',
+                output_field=models.JSONField(),
+            ),
+            modified=now,
+            last_used=now,
+        )
+        self.aliases.extend(new_aliases)
+        self.modified = now
+        self.last_used = now
 
 
 class VerificationResult(BaseModel):
@@ -136,14 +187,24 @@ class VerificationResult(BaseModel):
     feedback_date = models.DateTimeField(null=True, blank=True)
     feedback_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
 
+    # Estado general materializado por PostgreSQL al escribir (filtrable/ordenable en el admin)
+    overall_status = models.GeneratedField(
+        expression=models.Case(
+            models.When(
+                basic_data_match=True, supplies_match=True, traceability_complete=True,
+                then=models.Value('APROBADO'),
+            ),
+            models.When(requires_review=True, then=models.Value('REQUIERE_REVISION')),
+            default=models.Value('RECHAZADO'),
+        ),
+        output_field=models.CharField(max_length=20),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['overall_status']),
+        ]
+
     def __str__(self):
         return f"Verificación {self.surgical_case.case_number}"
-
-    @property
-    def overall_status(self):
-        if self.basic_data_match and self.supplies_match and self.traceability_complete:
-            return "APROBADO"
-        elif self.requires_review:
-            return "REQUIERE_REVISION"
-        else:
-            return "RECHAZADO"
@@ -1,57 +1,294 @@
+import calendar
+import hashlib
+import os
 import re
-import PyPDF2
-import io
+import shutil
+import subprocess
+from functools import lru_cache
+import pymupdf
 from PIL import Image
 import pytesseract
-from typing import Dict, List, Optional
-from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 import logging
+from django.core.cache import cache
 
 logger = logging.getLogger(__name__)
 
+# Fracción mínima de píxeles de tinta para considerar que una página tiene texto
+BLANK_PAGE_DENSITY = 0.005
+
+# El texto OCR se cachea por hash del archivo: re-procesar un caso no repite el OCR
+OCR_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+# Forma parte de la llave del caché OCR: subirla cada vez que _ocr_image cambie su salida
+OCR_PIPELINE_VERSION = 1
+
+# Tamaño mínimo al que se decodifican los JPEG grandes (fotos de celular) antes del OCR
+OCR_DRAFT_SIZE = (2000, 2000)
+# Resolución que se asume cuando la imagen no la trae en sus metadatos
+OCR_DEFAULT_DPI = 300
+CHUNK_SIZE = 64 * 1024
+
+# poppler-utils es opcional: si `pdftotext` está instalado se usa como vía rápida
+PDFTOTEXT_BINARY = shutil.which('pdftotext')
+PDFTOTEXT_TIMEOUT = 60
+
+# Patrones de campos básicos, en orden de prioridad (el primero que coincida gana).
+# Se evalúan campo por campo a propósito: los datos están en el encabezado y
+# search() corta en la primera coincidencia. Una alternación única recorre todo
+# el texto y además pierde campos que otro patrón ya consumió (p.ej. el nombre
+# del paciente se come la línea "ID:" siguiente).
+# Se buscan sin IGNORECASE sobre el texto en mayúsculas (ver _fold_case): el
+# motor de re evita el case-folding por carácter y usa el prefijo literal.
+# Cada patrón lleva su palabra ancla: si str.find no la encuentra se omite el
+# regex, y si la encuentra la búsqueda arranca desde ahí.
+PATIENT_NAME_PATTERNS = tuple(
+    (anchor, re.compile(pattern)) for anchor, pattern in (
+        ('PACIENTE', r'PACIENTE[:\s]*([A-ZÁÉÍÓÚÑ\s]+)'),
+        ('NOMBRE', r'NOMBRE[:\s]*([A-ZÁÉÍÓÚÑ\s]+)')
+    )
+)
+PATIENT_ID_PATTERNS = tuple(
+    (anchor, re.compile(pattern)) for anchor, pattern in (
+        ('ID', r'ID[:\s]*(\d+)'),
+        ('IDENTIFICACIÓN', r'IDENTIFICACIÓN[:\s]*(\d+)'),
+        ('CEDULA', r'CEDULA[:\s]*(\d+)'),
+        ('C.C', r'C\.C[:\s]*(\d+)')
+    )
+)
+DATE_PATTERNS = tuple(
+    (anchor, re.compile(pattern)) for anchor, pattern in (
+        ('FECHA', r'FECHA[:\s]*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})'),
+        (None, r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})'),
+        ('FECHA', r'FECHA[:\s]*(\d{1,2}\s+DE\s+\w+\s+DE\s+\d{4})')
+    )
+)
+CITY_PATTERNS = tuple(
+    (anchor, re.compile(pattern)) for anchor, pattern in (
+        ('CIUDAD', r'CIUDAD[:\s]*([A-ZÁÉÍÓÚÑ\s]+)'),
+        ('LUGAR', r'LUGAR[:\s]*([A-ZÁÉÍÓÚÑ\s]+)')
+    )
+)
+DOCTOR_PATTERNS = tuple(
+    (anchor, re.compile(pattern)) for anchor, pattern in (
+        ('MÉDICO', r'MÉDICO[:\s]*([A-ZÁÉÍÓÚÑ\s\.]+)'),
+        ('DOCTOR', r'DOCTOR[:\s]*([A-ZÁÉÍÓÚÑ\s\.]+)'),
+        ('DR.', r'DR\.[:\s]*([A-ZÁÉÍÓÚÑ\s\.]+)')
+    )
+)
+PROCEDURE_PATTERNS = tuple(
+    (anchor, re.compile(pattern)) for anchor, pattern in (
+        ('PROCEDIMIENTO', r'PROCEDIMIENTO[:\s]*([A-ZÁÉÍÓÚÑ\s\.,]+)'),
+        ('CIRUGÍA', r'CIRUGÍA[:\s]*([A-ZÁÉÍÓÚÑ\s\.,]+)'),
+        ('OPERACIÓN', r'OPERACIÓN[:\s]*([A-ZÁÉÍÓÚÑ\s\.,]+)')
+    )
+)
+
+# Nombre de insumo acotado y posesivo: sin tope, una línea larga sin "(n)" hace
+# que cada posición de inicio recorra el resto de la línea (tiempo cuadrático)
+SUPPLY_NAME = r'[A-Za-záéíóúñ\s\d\.,x×-]{1,80}+'
+
+# Formatos de fecha aceptados por _normalize_date: "01/02/2024", "1-2-24" y "1 de febrero de 2024"
+NUMERIC_DATE_PATTERN = re.compile(r'(\d{1,2})([/-])(\d{1,2})\2(\d{4}|\d{2})')
+SPANISH_DATE_PATTERN = re.compile(r'(\d{1,2})\s+de\s+(\w+)\s+de\s+(\d{4})', re.IGNORECASE)
+SPANISH_MONTHS = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6, 'julio': 7,
+    'agosto': 8, 'septiembre': 9, 'setiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12,
+}
+
+# Patrones de insumos compilados una sola vez y compartidos entre requests
+# Ejemplo: "Tornillo encefálico 3.5x55mm (2) REF: ABC123 LOT: DEF456 [UDI]"
+SUPPLY_TRACE_PATTERN = re.compile(
+    rf'(?P<name>{SUPPLY_NAME})\s*\((?P<quantity>\d{{1,4}})\)'
+    r'(?:\s*REF[:\s]*(?P<ref_code>[A-Z0-9]+))?(?:\s*LOT[:\s]*(?P<lot_code>[A-Z0-9]+))?(?P<udi>\s*\[UDI\])?',
+    re.IGNORECASE
+)
+SUPPLY_SIMPLE_PATTERN = re.compile(rf'(?P<name>{SUPPLY_NAME})\s*\((?P<quantity>\d{{1,4}})\)', re.IGNORECASE)
+SUPPLY_SECTION_PATTERNS = tuple(
+    re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in (
+        r'MATERIALES[:\s]*(?P<materials>[^\.]+)',
+        r'INSUMOS[:\s]*(?P<insumos>[^\.]+)',
+        r'SE UTILIZÓ[:\s]*(?P<utilizo>[^\.]+)',
+        r'IMPLANTES[:\s]*(?P<implantes>[^\.]+)'
+    )
+)
+DESCRIPTION_SUPPLY_PATTERNS = tuple(
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r'(?P<quantity>\d+)\s+(?P<name>[A-Za-záéíóúñ\s\d\.,x×-]+)',
+        rf'(?P<name>{SUPPLY_NAME})\s*\((?P<quantity>\d{{1,4}})\)'
+    )
+)
+
 
 class DocumentParserError(Exception):
     """Excepción para errores de parsing de documentos"""
     pass
 
 
-class BaseDocumentParser:
-    """Parser base para documentos médicos"""
+def _content_digest(source) -> str:
+    """Hash blake2b del contenido de una ruta en disco o de un archivo abierto"""
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(source, str):
+        with open(source, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+    else:
+        # El archivo pudo haberse leído antes (validación, detección de tipo)
+        source.seek(0)
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+        source.seek(0)
+    return digest.hexdigest()
+
+
+def _expand_two_digit_year(year: int) -> int:
+    """Misma regla que %y de strptime: 69-99 -> 19xx, 00-68 -> 20xx"""
+    return year + (1900 if year >= 69 else 2000)
+
+
+@lru_cache(maxsize=4)
+def _fold_case(text: str) -> str:
+    """
+    Texto en mayúsculas con la misma longitud que el original, para recortar
+    los valores del texto original con los spans. Se cachea porque los seis
+    extractores reciben el mismo texto.
+    """
+    folded = text.upper()
+    if len(folded) != len(text):
+        # Caracteres como "ß" cambian de longitud al pasar a mayúsculas
+        folded = ''.join(char.upper() if len(char.upper()) == 1 else char for char in text)
+    return folded
+
+
+def _first_match(patterns, text: str) -> str:
+    """Retorna el primer grupo capturado por el primer patrón que coincida"""
+    folded = _fold_case(text)
+    for anchor, pattern in patterns:
+        pos = 0
+        if anchor is not None:
+            pos = folded.find(anchor)
+            if pos < 0:
+                continue
+        match = pattern.search(folded, pos)
+        if match:
+            return text[match.start(1):match.end(1)].strip()
+    return ""
+
+
+def _otsu_threshold(histogram: List[int]) -> int:
+    """Umbral de Otsu a partir del histograma de 256 niveles de una imagen en grises"""
+    total = sum(histogram)
+    sum_total = sum(level * count for level, count in enumerate(histogram))
+    sum_background = weight_background = 0
+    best_threshold, best_variance = 0, 0.0
+
+    for level, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += level * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_total - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = level, variance
+
+    return best_threshold
+
+
+def binarize_image(image: Image.Image) -> Image.Image:
+    """
+    Escala de grises + umbral de Otsu antes del OCR. Histograma y tabla de
+    conversión se aplican en C (Pillow), evitando el preprocesado de tesseract.
+    """
+    gray = image.convert('L')
+    threshold = _otsu_threshold(gray.histogram())
+    return gray.point([0 if level <= threshold else 255 for level in range(256)])
+
+
+def is_blank_image(binary: Image.Image) -> bool:
+    """Indica si una imagen ya binarizada casi no tiene tinta (página en blanco)"""
+    width, height = binary.size
+    ink_pixels = binary.histogram()[0]
+    return ink_pixels < BLANK_PAGE_DENSITY * width * height
 
-    def __init__(self):
-        self.extracted_data = {}
-        self.raw_text = ""
-        self.confidence_score = 0.0
+
+class BaseDocumentParser:
+    """
+    Parser base para documentos médicos. No guarda estado por documento:
+    una misma instancia se puede reutilizar entre documentos e hilos.
+    """
 
     def parse_file(self, file) -> Dict:
         """Extrae texto de un archivo y parsea los datos básicos"""
         try:
-            self.raw_text = self._extract_text(file)
-            self.extracted_data = self._parse_basic_data(self.raw_text)
-            self.extracted_data['raw_text'] = self.raw_text
-            return self.extracted_data
+            raw_text, confidence_score = self._extract_text(file)
+            return {
+                **self._parse_basic_data(raw_text),
+                'raw_text': raw_text,
+                'confidence_score': confidence_score,
+            }
         except Exception as e:
             logger.error(f"Error parsing file: {str(e)}")
             raise DocumentParserError(f"Error procesando documento: {str(e)}")
 
-    def _extract_text(self, file) -> str:
-        """Extrae texto del archivo según su tipo"""
+    def _extract_text(self, file) -> Tuple[str, float]:
+        """Extrae (texto, confianza OCR) del archivo según su tipo; la confianza es 0 sin OCR"""
         file_extension = file.name.lower().split('.')[-1]
 
         if file_extension == 'pdf':
-            return self._extract_from_pdf(file)
+            return self._extract_from_pdf(file), 0.0
         elif file_extension in ['jpg', 'jpeg', 'png', 'bmp', 'tiff']:
             return self._extract_from_image(file)
         else:
             raise DocumentParserError(f"Tipo de archivo no soportado: {file_extension}")
 
+    def _local_path(self, file) -> Optional[str]:
+        """Ruta en disco del archivo si existe (upload temporal o storage local)"""
+        if hasattr(file, 'temporary_file_path'):
+            return file.temporary_file_path()
+        try:
+            path = file.path
+        except (AttributeError, NotImplementedError, ValueError):
+            return None
+        return path if os.path.exists(path) else None
+
+    def _open_source(self, file):
+        """Retorna la ruta en disco si existe, o los bytes del archivo leídos una sola vez"""
+        return self._local_path(file) or file.read()
+
+    def _extract_with_pdftotext(self, source) -> Optional[str]:
+        """Extrae texto con el binario pdftotext; None si no está disponible o falla"""
+        if not PDFTOTEXT_BINARY:
+            return None
+        if isinstance(source, str):
+            args, stdin = [PDFTOTEXT_BINARY, '-layout', source, '-'], None
+        else:
+            args, stdin = [PDFTOTEXT_BINARY, '-layout', '-', '-'], source
+        try:
+            result = subprocess.run(
+                args, input=stdin, capture_output=True, check=True, timeout=PDFTOTEXT_TIMEOUT
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"pdftotext falló, usando PyMuPDF: {str(e)}")
+            return None
+        return result.stdout.decode('utf-8', 'replace')
+
     def _extract_from_pdf(self, file) -> str:
         """Extrae texto de un PDF"""
         try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file.read()))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
+            source = self._open_source(file)
+            text = self._extract_with_pdftotext(source)
+            if text is None:
+                if isinstance(source, str):
+                    pdf = pymupdf.open(source)
+                else:
+                    pdf = pymupdf.open(stream=source, filetype='pdf')
+                with pdf:
+                    # Páginas separadas por form feed, igual que la salida de pdftotext
+                    text = "\f".join(page.get_text("text") for page in pdf)
 
             # Si no hay texto extraído, es posible que sea un PDF escaneado
             if not text.strip():
@@ -62,165 +299,134 @@ class BaseDocumentParser:
         except Exception as e:
             raise DocumentParserError(f"Error extrayendo texto de PDF: {str(e)}")
 
-    def _extract_from_image(self, file) -> str:
-        """Extrae texto de una imagen usando OCR"""
+    def _extract_from_image(self, file) -> Tuple[str, float]:
+        """Extrae (texto, confianza) de una imagen usando OCR (cacheado por contenido del archivo)"""
         try:
-            image = Image.open(io.BytesIO(file.read()))
-            # Configuración básica de tesseract para español
-            config = '--oem 3 --psm 6 -l spa'
-            text = pytesseract.image_to_string(image, config=config)
-
-            # Calcular confianza básica
-            data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
-            confidences = [int(conf) for conf in data['conf'] if int(conf) > 0]
-            self.confidence_score = sum(confidences) / len(confidences) if confidences else 0
-
-            return text
+            # PIL lee directamente del archivo, sin copiarlo a memoria
+            source = self._local_path(file) or file
+            cache_key = f'ocr_text:v{OCR_PIPELINE_VERSION}:{_content_digest(source)}'
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            result = self._ocr_image(Image.open(source))
+            cache.set(cache_key, result, OCR_CACHE_TIMEOUT)
+            return result
         except Exception as e:
             raise DocumentParserError(f"Error en OCR de imagen: {str(e)}")
 
-    def _parse_basic_data(self, text: str) -> Dict:
-        """Parsea datos básicos del texto extraído - debe ser sobrescrito"""
-        raise NotImplementedError("Debe implementarse en clases hijas")
-
-
-class InternalReportParser(BaseDocumentParser):
-    """Parser para Reporte de Gasto Quirúrgico Interno"""
-
-    def _parse_basic_data(self, text: str) -> Dict:
-        data = {
-            'patient_name': self._extract_patient_name(text),
-            'patient_id': self._extract_patient_id(text),
-            'date': self._extract_date(text),
-            'city': self._extract_city(text),
-            'doctor': self._extract_doctor(text),
-            'procedure': self._extract_procedure(text),
-            'supplies': self._extract_supplies_with_traceability(text)
-        }
-        return data
-
+    def _ocr_image(self, image: Image.Image) -> Tuple[str, float]:
+        """Ejecuta tesseract sobre la imagen y retorna (texto, confianza promedio)"""
+        # Configuración básica de tesseract para español
+        config = '--oem 3 --psm 6 -l spa'
+        source_dpi = (image.info.get('dpi') or (OCR_DEFAULT_DPI,))[0] or OCR_DEFAULT_DPI
+        source_width = image.width
+        # JPEG: el decoder reduce la escala (1/2, 1/4, 1/8) y entrega grises directamente
+        image.draft('L', OCR_DRAFT_SIZE)
+        # La resolución efectiva baja en la misma proporción que la imagen
+        config += f' --dpi {round(source_dpi * image.width / source_width)}'
+        image = binarize_image(image)
+        if is_blank_image(image):
+            # Páginas en blanco: no vale la pena pasar por tesseract
+            return "", 0
+        # Una sola pasada de OCR: el texto y la confianza salen del mismo resultado
+        data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+        text = self._join_ocr_words(data)
+
+        # Calcular confianza básica
+        confidences = [int(conf) for conf in data['conf'] if int(conf) > 0]
+        confidence = sum(confidences) / len(confidences) if confidences else 0
+        return text, confidence
+
+    def _join_ocr_words(self, data: Dict) -> str:
+        """Reconstruye el texto de image_to_data respetando los saltos de línea"""
+        lines = {}
+        for i, word in enumerate(data['text']):
+            if word.strip():
+                key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+                lines.setdefault(key, []).append(word)
+        return "\n".join(" ".join(words) for words in lines.values())
+
+    # Extractores de campos básicos comunes a los tres tipos de documento
     def _extract_patient_name(self, text: str) -> str:
         """Extrae nombre del paciente"""
-        patterns = [
-            r'PACIENTE[:\s]*([A-ZÁÉÍÓÚÑ\s]+)',
-            r'NOMBRE[:\s]*([A-ZÁÉÍÓÚÑ\s]+)',
-            r'Paciente[:\s]*([A-Za-záéíóúñ\s]+)'
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
-        return ""
+        return _first_match(PATIENT_NAME_PATTERNS, text)
 
     def _extract_patient_id(self, text: str) -> str:
         """Extrae identificación del paciente"""
-        patterns = [
-            r'ID[:\s]*(\d+)',
-            r'IDENTIFICACIÓN[:\s]*(\d+)',
-            r'CEDULA[:\s]*(\d+)',
-            r'C\.C[:\s]*(\d+)'
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
-        return ""
+        return _first_match(PATIENT_ID_PATTERNS, text)
 
     def _extract_date(self, text: str) -> Optional[str]:
         """Extrae fecha de la cirugía"""
-        patterns = [
-            r'FECHA[:\s]*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'FECHA[:\s]*(\d{1,2}\s+de\s+\w+\s+de\s+\d{4})'
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                date_str = match.group(1).strip()
-                # Aquí podrías normalizar el formato de fecha
-                return self._normalize_date(date_str)
+        date_str = _first_match(DATE_PATTERNS, text)
+        if date_str:
+            return self._normalize_date(date_str)
         return None
 
     def _normalize_date(self, date_str: str) -> Optional[str]:
         """Normaliza formato de fecha a YYYY-MM-DD"""
-        try:
-            # Intentar varios formatos
-            formats = ['%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y']
-            for fmt in formats:
-                try:
-                    date_obj = datetime.strptime(date_str, fmt)
-                    return date_obj.strftime('%Y-%m-%d')
-                except ValueError:
-                    continue
-        except:
-            pass
-        return None
+        match = NUMERIC_DATE_PATTERN.fullmatch(date_str)
+        if match:
+            day, month, year = int(match.group(1)), int(match.group(3)), match.group(4)
+            year = int(year) if len(year) == 4 else _expand_two_digit_year(int(year))
+        else:
+            match = SPANISH_DATE_PATTERN.fullmatch(date_str)
+            if not match:
+                return None
+            month = SPANISH_MONTHS.get(match.group(2).lower())
+            if month is None:
+                return None
+            day, year = int(match.group(1)), int(match.group(3))
+
+        if not (1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1]):
+            return None
+        return f"{year:04d}-{month:02d}-{day:02d}"
 
     def _extract_city(self, text: str) -> str:
         """Extrae ciudad"""
-        patterns = [
-            r'CIUDAD[:\s]*([A-Za-záéíóúñ\s]+)',
-            r'LUGAR[:\s]*([A-Za-záéíóúñ\s]+)'
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
-        return ""
+        return _first_match(CITY_PATTERNS, text)
 
     def _extract_doctor(self, text: str) -> str:
         """Extrae nombre del médico"""
-        patterns = [
-            r'MÉDICO[:\s]*([A-Za-záéíóúñ\s\.]+)',
-            r'DOCTOR[:\s]*([A-Za-záéíóúñ\s\.]+)',
-            r'DR\.[:\s]*([A-Za-záéíóúñ\s\.]+)'
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
-        return ""
+        return _first_match(DOCTOR_PATTERNS, text)
 
     def _extract_procedure(self, text: str) -> str:
         """Extrae procedimiento quirúrgico"""
-        patterns = [
-            r'PROCEDIMIENTO[:\s]*([A-Za-záéíóúñ\s\.,]+)',
-            r'CIRUGÍA[:\s]*([A-Za-záéíóúñ\s\.,]+)',
-            r'OPERACIÓN[:\s]*([A-Za-záéíóúñ\s\.,]+)'
-        ]
+        return _first_match(PROCEDURE_PATTERNS, text)
 
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
-        return ""
+    def _parse_basic_data(self, text: str) -> Dict:
+        """Parsea datos básicos del texto extraído - debe ser sobrescrito"""
+        raise NotImplementedError("Debe implementarse en clases hijas")
 
-    def _extract_supplies_with_traceability(self, text: str) -> List[Dict]:
-        """Extrae insumos con información de trazabilidad (REF/LOT/UDI)"""
-        supplies = []
 
-        # Buscar patrones de insumos con formato típico
-        # Ejemplo: "Tornillo encefálico 3.5x55mm (2) REF: ABC123 LOT: DEF456 [UDI]"
-        pattern = r'([A-Za-záéíóúñ\s\d\.,x×-]+)\s*\((\d+)\)(?:\s*REF[:\s]*([A-Z0-9]+))?(?:\s*LOT[:\s]*([A-Z0-9]+))?(\s*\[UDI\])?'
+class InternalReportParser(BaseDocumentParser):
+    """Parser para Reporte de Gasto Quirúrgico Interno"""
 
-        matches = re.findall(pattern, text, re.IGNORECASE)
+    def _parse_basic_data(self, text: str) -> Dict:
+        data = {
+            'patient_name': self._extract_patient_name(text),
+            'patient_id': self._extract_patient_id(text),
+            'date': self._extract_date(text),
+            'city': self._extract_city(text),
+            'doctor': self._extract_doctor(text),
+            'procedure': self._extract_procedure(text),
+            'supplies': self._extract_supplies_with_traceability(text)
+        }
+        return data
 
-        for match in matches:
-            supply = {
-                'name': match[0].strip(),
-                'quantity': int(match[1]) if match[1].isdigit() else 1,
-                'ref_code': match[2] if match[2] else '',
-                'lot_code': match[3] if match[3] else '',
-                'udi_label_present': bool(match[4])
+    def _extract_supplies_with_traceability(self, text: str) -> List[Dict]:
+        """Extrae insumos con información de trazabilidad (REF/LOT/UDI)"""
+        # Buscar patrones de insumos con formato típico (ver SUPPLY_TRACE_PATTERN)
+        return [
+            {
+                'name': match['name'].strip(),
+                'quantity': int(match['quantity']),
+                'ref_code': match['ref_code'] or '',
+                'lot_code': match['lot_code'] or '',
+                'udi_label_present': match['udi'] is not None
             }
-            supplies.append(supply)
-
-        return supplies
+            for match in SUPPLY_TRACE_PATTERN.finditer(text)
+        ]
 
 
 class HospitalReportParser(BaseDocumentParser):
@@ -238,42 +444,13 @@ class HospitalReportParser(BaseDocumentParser):
         }
         return data
 
-    def _extract_patient_name(self, text: str) -> str:
-        # Similar al interno pero puede tener variaciones
-        return InternalReportParser()._extract_patient_name(text)
-
-    def _extract_patient_id(self, text: str) -> str:
-        return InternalReportParser()._extract_patient_id(text)
-
-    def _extract_date(self, text: str) -> Optional[str]:
-        return InternalReportParser()._extract_date(text)
-
-    def _extract_city(self, text: str) -> str:
-        return InternalReportParser()._extract_city(text)
-
-    def _extract_doctor(self, text: str) -> str:
-        return InternalReportParser()._extract_doctor(text)
-
-    def _extract_procedure(self, text: str) -> str:
-        return InternalReportParser()._extract_procedure(text)
-
     def _extract_supplies_simple(self, text: str) -> List[Dict]:
         """Extrae insumos sin información de trazabilidad"""
-        supplies = []
-
         # Patrón más simple para reporte de hospital
-        pattern = r'([A-Za-záéíóúñ\s\d\.,x×-]+)\s*\((\d+)\)'
-
-        matches = re.findall(pattern, text, re.IGNORECASE)
-
-        for match in matches:
-            supply = {
-                'name': match[0].strip(),
-                'quantity': int(match[1]) if match[1].isdigit() else 1
-            }
-            supplies.append(supply)
-
-        return supplies
+        return [
+            {'name': match['name'].strip(), 'quantity': int(match['quantity'])}
+            for match in SUPPLY_SIMPLE_PATTERN.finditer(text)
+        ]
 
 
 class SurgicalDescriptionParser(BaseDocumentParser):
@@ -291,39 +468,14 @@ class SurgicalDescriptionParser(BaseDocumentParser):
         }
         return data
 
-    def _extract_patient_name(self, text: str) -> str:
-        return InternalReportParser()._extract_patient_name(text)
-
-    def _extract_patient_id(self, text: str) -> str:
-        return InternalReportParser()._extract_patient_id(text)
-
-    def _extract_date(self, text: str) -> Optional[str]:
-        return InternalReportParser()._extract_date(text)
-
-    def _extract_city(self, text: str) -> str:
-        return InternalReportParser()._extract_city(text)
-
-    def _extract_doctor(self, text: str) -> str:
-        return InternalReportParser()._extract_doctor(text)
-
-    def _extract_procedure(self, text: str) -> str:
-        return InternalReportParser()._extract_procedure(text)
-
     def _extract_supplies_from_description(self, text: str) -> List[Dict]:
         """Extrae insumos mencionados en la descripción quirúrgica usando grupos nombrados"""
         supplies = []
 
         # Buscar secciones que mencionen insumos utilizados
-        patterns = [
-            r'MATERIALES[:\s]*(?P<materials>[^\.]+)',
-            r'INSUMOS[:\s]*(?P<insumos>[^\.]+)',
-            r'SE UTILIZÓ[:\s]*(?P<utilizo>[^\.]+)',
-            r'IMPLANTES[:\s]*(?P<implantes>[^\.]+)'
-        ]
-
         supply_text = ""
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        for pattern in SUPPLY_SECTION_PATTERNS:
+            match = pattern.search(text)
             if match:
                 # Extraer el grupo nombrado
                 for group_name in match.groupdict():
@@ -332,13 +484,8 @@ class SurgicalDescriptionParser(BaseDocumentParser):
 
         if supply_text:
             # Extraer nombres de insumos de la descripción
-            supply_patterns = [
-                r'(?P<quantity>\d+)\s+(?P<name>[A-Za-záéíóúñ\s\d\.,x×-]+)',
-                r'(?P<name>[A-Za-záéíóúñ\s\d\.,x×-]+)\s*\((?P<quantity>\d+)\)'
-            ]
-
-            for pattern in supply_patterns:
-                matches = re.finditer(pattern, supply_text, re.IGNORECASE)
+            for pattern in DESCRIPTION_SUPPLY_PATTERNS:
+                matches = pattern.finditer(supply_text)
                 for match in matches:
                     name = match.group('name').strip()
                     quantity = match.group('quantity')
@@ -354,14 +501,17 @@ class SurgicalDescriptionParser(BaseDocumentParser):
 class DocumentParserFactory:
     """Factory para crear parsers según el tipo de documento"""
 
-    @staticmethod
-    def get_parser(document_type: str) -> BaseDocumentParser:
+    # Los parsers no guardan estado por documento: una instancia compartida por tipo
+    PARSERS = {
+        'internal': InternalReportParser(),
+        'hospital': HospitalReportParser(),
+        'description': SurgicalDescriptionParser(),
+    }
+
+    @classmethod
+    def get_parser(cls, document_type: str) -> BaseDocumentParser:
         """Retorna el parser apropiado según el tipo de documento"""
-        if document_type == 'internal':
-            return InternalReportParser()
-        elif document_type == 'hospital':
-            return HospitalReportParser()
-        elif document_type == 'description':
-            return SurgicalDescriptionParser()
-        else:
+        try:
+            return cls.PARSERS[document_type]
+        except KeyError:
             raise ValueError(f"Tipo de documento no soportado: {document_type}")
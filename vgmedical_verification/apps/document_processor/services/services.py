@@ -1,9 +1,16 @@
 import re
-import unicodedata
+import hashlib
+import secrets
+import threading
 import logging
-from typing import Dict, List, Optional
-from rapidfuzz import fuzz
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+from rapidfuzz import fuzz, process
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Count, Max, Q
 from django.utils import timezone
 
 from vgmedical_verification.apps.document_processor.models import (
@@ -11,10 +18,65 @@ from vgmedical_verification.apps.document_processor.models import (
     SupplyEquivalence
 )
 from vgmedical_verification.apps.document_processor.parsers import DocumentParserFactory
-from vgmedical_verification.apps.verification.engine import VerificationEngine, SupplyMatcher
+from vgmedical_verification.apps.verification.engine import VerificationEngine, SupplyMatcher, strip_accents
 
 logger = logging.getLogger(__name__)
 
+# Los reportes se cachean por versión (la llave cambia con cada modificación)
+REPORT_CACHE_TIMEOUT = 60 * 60
+
+# Tamaño de lote para inserciones masivas de insumos
+SUPPLY_BATCH_SIZE = 500
+
+# Formatos de fecha aceptados además de ISO (YYYY-MM-DD)
+CASE_DATE_FORMATS = ('%d/%m/%Y', '%d-%m-%Y')
+
+# Columnas que escribe el procesamiento (evita reescribir la fila completa)
+DOCUMENT_EXTRACTED_FIELDS = (
+    'extracted_text', 'extracted_patient_name', 'extracted_patient_id', 'extracted_date',
+    'extracted_city', 'extracted_doctor', 'extracted_procedure', 'status', 'processed_at',
+)
+CASE_EXTRACTED_FIELDS = (
+    ('patient_name', 'patient_name'),
+    ('patient_id', 'patient_id'),
+    ('city', 'city'),
+    ('doctor_name', 'doctor'),
+    ('procedure', 'procedure'),
+)
+
+# Hilos para extraer el texto de los documentos de un caso (uno por tipo)
+PARSER_MAX_WORKERS = 3
+
+
+# Normalización de nombres para equivalencias (patrones compilados una sola vez)
+EQUIVALENCE_INVALID_CHARS_PATTERN = re.compile(r'[^\w\s\d\.,x\-]')
+EQUIVALENCE_SPACES_PATTERN = re.compile(r'\s+')
+EQUIVALENCE_DIMENSIONS_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*x\s*(\d+(?:\.\d+)?)')
+EQUIVALENCE_REPLACEMENTS = {
+    'standard': 'estandar',
+}
+# Nombre ya normalizado: ASCII en minúscula con espacios simples
+EQUIVALENCE_NORMALIZED_PATTERN = re.compile(r'[a-z0-9_\.,-]+(?: [a-z0-9_\.,-]+)*')
+
+
+@lru_cache(maxsize=8192)
+def normalize_equivalence_name(name: str) -> str:
+    """
+    Normaliza nombre para equivalencias, quitando acentos y estandarizando tokens.
+    Cacheada: las sugerencias comparan los mismos nombres muchas veces.
+    """
+    if (EQUIVALENCE_NORMALIZED_PATTERN.fullmatch(name) and 'x ' not in name
+            and ' x' not in name and 'standard' not in name):
+        return name
+    # '×' no se descompone con NFKD: se unifica con 'x' antes de quitar acentos
+    s = strip_accents(name.replace('×', 'x')).lower().strip()
+    s = EQUIVALENCE_INVALID_CHARS_PATTERN.sub('', s)
+    s = EQUIVALENCE_SPACES_PATTERN.sub(' ', s)
+    s = EQUIVALENCE_DIMENSIONS_PATTERN.sub(r'\1x\2', s)
+    for old, new in EQUIVALENCE_REPLACEMENTS.items():
+        s = s.replace(old, new)
+    return s
+
 
 class DocumentProcessingError(Exception):
     """Excepción para errores de procesamiento de documentos"""
@@ -45,31 +107,23 @@ class DocumentProcessor:
             SurgicalCase procesado con verificación completa
         """
 
-        if len(files_data) != 3:
-            raise DocumentProcessingError(
-                f"Se requieren exactamente 3 documentos, se recibieron {len(files_data)}"
-            )
-
-        # Verificar que tenemos los 3 tipos requeridos
-        doc_types = {item['document_type'] for item in files_data}
-        required_types = {DocumentType.INTERNAL, DocumentType.HOSPITAL, DocumentType.DESCRIPTION}
-
-        if doc_types != required_types:
-            missing = required_types - doc_types
-            raise DocumentProcessingError(
-                f"Faltan tipos de documento: {', '.join(missing)}"
-            )
+        self._validate_files_data(files_data)
 
         try:
+            # 1. Parsear los 3 archivos en paralelo, antes de abrir la transacción
+            extracted = self._parse_concurrently(self._parse_file, files_data)
+
             with transaction.atomic():
-                # 1. Crear caso quirúrgico
+                # 2. Crear caso quirúrgico
                 case = self._create_surgical_case(files_data, user)
 
-                # 2. Procesar cada documento
-                for file_data in files_data:
-                    self._process_document(case, file_data)
+                # 3. Guardar cada documento con sus datos extraídos; insumos de los 3 en un solo INSERT
+                supplies = []
+                for file_data, extracted_data in zip(files_data, extracted):
+                    supplies += self._persist_document(case, file_data, extracted_data)
+                self._create_supplies(supplies)
 
-                # 3. Ejecutar verificación completa
+                # 4. Ejecutar verificación completa
                 verification_result = self.verification_engine.verify_case(case)
 
                 logger.info(
@@ -83,6 +137,107 @@ class DocumentProcessor:
             logger.error(f"Error procesando caso quirúrgico: {str(e)}")
             raise DocumentProcessingError(f"Error procesando caso: {str(e)}")
 
+    def register_surgical_case(self, files_data: List[Dict], user) -> SurgicalCase:
+        """
+        Registra un caso quirúrgico y guarda sus 3 documentos sin procesarlos,
+        para que el parsing y la verificación se ejecuten en segundo plano
+        (ver process_registered_case).
+
+        Args:
+            files_data: Misma estructura que en process_surgical_case
+            user: Usuario que sube los documentos
+
+        Returns:
+            SurgicalCase con sus documentos en estado UPLOADED
+        """
+
+        self._validate_files_data(files_data)
+
+        with transaction.atomic():
+            case = self._create_surgical_case(files_data, user)
+            for file_data in files_data:
+                Document.objects.create(
+                    surgical_case=case,
+                    document_type=file_data['document_type'],
+                    file=file_data['file'],
+                    status=DocumentStatus.UPLOADED
+                )
+
+        return case
+
+    def process_registered_case(self, case: SurgicalCase) -> SurgicalCase:
+        """
+        Procesa los documentos ya guardados de un caso registrado con
+        register_surgical_case y ejecuta la verificación completa
+
+        Returns:
+            SurgicalCase procesado con verificación completa
+        """
+
+        # Solo los documentos sin extraer: un reintento (acks_late) no duplica insumos
+        documents = list(case.documents.exclude(status=DocumentStatus.PROCESSED))
+
+        try:
+            extracted = self._parse_concurrently(self._parse_stored_document, documents)
+
+            with transaction.atomic():
+                Supply.all_objects.filter(document__in=documents).delete()
+                supplies = []
+                for document, extracted_data in zip(documents, extracted):
+                    supplies += self._apply_extracted_data(case, document, extracted_data)
+                self._create_supplies(supplies)
+
+        except Exception as e:
+            logger.error(f"Error procesando caso quirúrgico {case.case_number}: {str(e)}")
+            # Dejar constancia del error en los documentos (la extracción se revirtió)
+            case.documents.filter(pk__in=[document.pk for document in documents]).update(
+                status=DocumentStatus.ERROR, processing_error=str(e), modified=timezone.now()
+            )
+            raise DocumentProcessingError(f"Error procesando caso: {str(e)}")
+
+        try:
+            # Verificación (fuzzy matching, CPU) fuera de la transacción de escritura;
+            # hasta que termine el reporte del caso sigue en estado 'processing'
+            verification_result = self.verification_engine.verify_case(case)
+        except Exception as e:
+            # La extracción ya quedó guardada: los documentos siguen procesados, pero el
+            # error queda registrado para que el reporte no se quede en 'processing'
+            logger.error(f"Error verificando caso quirúrgico {case.case_number}: {str(e)}")
+            case.documents.update(
+                processing_error=f"Error verificando caso: {str(e)}", modified=timezone.now()
+            )
+            raise DocumentProcessingError(f"Error verificando caso: {str(e)}")
+
+        # Un reintento exitoso limpia los errores registrados en intentos anteriores
+        case.documents.exclude(processing_error='').update(
+            processing_error='', modified=timezone.now()
+        )
+
+        logger.info(
+            f"Caso {case.case_number} procesado exitosamente. "
+            f"Score: {verification_result.verification_score}"
+        )
+
+        return case
+
+    def _validate_files_data(self, files_data: List[Dict]):
+        """Verifica que se recibieron exactamente los 3 tipos de documento requeridos"""
+
+        if len(files_data) != 3:
+            raise DocumentProcessingError(
+                f"Se requieren exactamente 3 documentos, se recibieron {len(files_data)}"
+            )
+
+        # Verificar que tenemos los 3 tipos requeridos
+        doc_types = {item['document_type'] for item in files_data}
+        required_types = {DocumentType.INTERNAL, DocumentType.HOSPITAL, DocumentType.DESCRIPTION}
+
+        if doc_types != required_types:
+            missing = required_types - doc_types
+            raise DocumentProcessingError(
+                f"Faltan tipos de documento: {', '.join(missing)}"
+            )
+
     def _create_surgical_case(self, files_data: List[Dict], user) -> SurgicalCase:
         """Crea el caso quirúrgico principal"""
 
@@ -106,22 +261,26 @@ class DocumentProcessor:
 
     def _generate_case_number(self) -> str:
         """Genera un número único para el caso"""
-        from datetime import datetime
-        import uuid
-
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        short_uuid = str(uuid.uuid4())[:8]
-        return f"VG_{timestamp}_{short_uuid}"
+        return f"VG_{timestamp}_{secrets.token_hex(4)}"
+
+    def _parse_concurrently(self, parse, items: List) -> List[Dict]:
+        """
+        Ejecuta `parse` sobre cada elemento en hilos, conservando el orden.
+        OCR/extracción fuera de la transacción: tesseract y pdftotext corren
+        como subprocesos, así que los hilos no compiten por el GIL.
+        """
+        with ThreadPoolExecutor(max_workers=PARSER_MAX_WORKERS) as executor:
+            return list(executor.map(parse, items))
 
-    def _process_document(self, case: SurgicalCase, file_data: Dict) -> Document:
-        """Procesa un documento individual
-        (parsea antes de guardar para evitar issues con el stream)
+    def _parse_file(self, file_data: Dict) -> Dict:
+        """Parsea un archivo subido (no toca la BD, se puede ejecutar en un hilo aparte)
+        y deja el puntero al inicio para guardarlo luego en el FileField
         """
 
         file_obj = file_data['file']
         doc_type = file_data['document_type']
 
-        # 1) Parsear PRIMERO (y asegurar puntero al inicio)
         try:
             if hasattr(file_obj, "seek"):
                 file_obj.seek(0)
@@ -129,20 +288,46 @@ class DocumentProcessor:
             parser = DocumentParserFactory.get_parser(doc_type)
             extracted_data = parser.parse_file(file_obj)
 
-            # 2) Rewind otra vez antes de asignar al FileField
             if hasattr(file_obj, "seek"):
                 file_obj.seek(0)
         except Exception as e:
             raise DocumentProcessingError(f"Error procesando documento {doc_type}: {str(e)}")
 
-        # 3) Crear documento y persistir
+        return extracted_data
+
+    def _persist_document(self, case: SurgicalCase, file_data: Dict, extracted_data: Dict) -> List[Supply]:
+        """Crea el documento del caso y persiste los datos ya extraídos (insumos sin guardar)"""
+
         document = Document.objects.create(
             surgical_case=case,
-            document_type=doc_type,
-            file=file_obj,
+            document_type=file_data['document_type'],
+            file=file_data['file'],
             status=DocumentStatus.PROCESSING
         )
 
+        return self._apply_extracted_data(case, document, extracted_data)
+
+    def _parse_stored_document(self, document: Document) -> Dict:
+        """Extrae los datos de un documento cuyo archivo ya está guardado en el storage
+        (no toca la BD, se puede ejecutar en un hilo aparte)
+        """
+
+        try:
+            parser = DocumentParserFactory.get_parser(document.document_type)
+            with document.file.open('rb') as file_obj:
+                return parser.parse_file(file_obj)
+        except Exception as e:
+            raise DocumentProcessingError(
+                f"Error procesando documento {document.document_type}: {str(e)}"
+            )
+
+    def _apply_extracted_data(self, case: SurgicalCase, document: Document,
+                              extracted_data: Dict) -> List[Supply]:
+        """
+        Persiste en el documento (y el caso) los datos extraídos por el parser.
+        Retorna los insumos sin guardar para insertarlos junto con los de los otros documentos.
+        """
+
         try:
             # Actualizar documento con datos extraídos
             document.extracted_text = extracted_data.get('raw_text', '')
@@ -154,38 +339,42 @@ class DocumentProcessor:
             document.extracted_procedure = extracted_data.get('procedure', '')
             document.status = DocumentStatus.PROCESSED
             document.processed_at = timezone.now()
-            document.save()
-
-            # Crear insumos
-            self._create_supplies(document, extracted_data.get('supplies', []))
+            document.save(update_fields=DOCUMENT_EXTRACTED_FIELDS)
 
             # Actualizar datos del caso con información más precisa
             self._update_case_data(case, document, extracted_data)
 
-            return document
+            return self._build_supplies(document, extracted_data.get('supplies', []))
 
         except Exception as e:
             document.status = DocumentStatus.ERROR
             document.processing_error = str(e)
-            document.save()
-            raise DocumentProcessingError(f"Error procesando documento {doc_type}: {str(e)}")
+            document.save(update_fields=['status', 'processing_error'])
+            raise DocumentProcessingError(
+                f"Error procesando documento {document.document_type}: {str(e)}"
+            )
 
     def _parse_date(self, date_str: Optional[str]):
-        """Convierte string de fecha a objeto date"""
+        """Convierte string de fecha a objeto date (ISO primero, que es lo que emiten los parsers)"""
         if not date_str:
             return None
 
         try:
-            from datetime import datetime
-            return datetime.strptime(date_str, '%Y-%m-%d').date()
+            return date.fromisoformat(date_str)
         except (ValueError, TypeError):
-            return None
+            pass
+        for fmt in CASE_DATE_FORMATS:
+            try:
+                return datetime.strptime(date_str, fmt).date()
+            except (ValueError, TypeError):
+                continue
+        return None
 
-    def _create_supplies(self, document: Document, supplies_data: List[Dict]):
-        """Crea los insumos asociados al documento"""
+    def _build_supplies(self, document: Document, supplies_data: List[Dict]) -> List[Supply]:
+        """Construye (sin guardar) los insumos asociados al documento"""
 
-        for supply_data in supplies_data:
-            Supply.objects.create(
+        return [
+            Supply(
                 document=document,
                 name=supply_data.get('name', ''),
                 quantity=supply_data.get('quantity', 1),
@@ -194,6 +383,12 @@ class DocumentProcessor:
                 udi_label_present=supply_data.get('udi_label_present', False),
                 confidence=supply_data.get('confidence', 0.0)
             )
+            for supply_data in supplies_data
+        ]
+
+    def _create_supplies(self, supplies: List[Supply]):
+        """Inserta los insumos de todos los documentos del caso"""
+        Supply.objects.bulk_create(supplies, batch_size=SUPPLY_BATCH_SIZE)
 
     def _update_case_data(self, case: SurgicalCase, document: Document, extracted_data: Dict):
         """
@@ -201,47 +396,26 @@ class DocumentProcessor:
         Sobrescribe con prioridad al documento interno, hospital/description solo si vacío.
         """
 
-        updated = False
-
-        def _choose(old_val, new_val, is_internal):
-            if not new_val:
-                return old_val, False
-            if is_internal:
-                return new_val, (new_val != old_val)
-            if not old_val:
-                return new_val, True
-            return old_val, False
-
+        changed_fields = set()
         is_internal = (document.document_type == DocumentType.INTERNAL)
 
-        case.patient_name, ch = _choose(case.patient_name, extracted_data.get('patient_name'), is_internal);
-        updated |= ch
-        case.patient_id, ch = _choose(case.patient_id, extracted_data.get('patient_id'), is_internal);
-        updated |= ch
+        for field, key in CASE_EXTRACTED_FIELDS:
+            new_val = extracted_data.get(key)
+            if not new_val:
+                continue
+            old_val = getattr(case, field)
+            if (is_internal and new_val != old_val) or not old_val:
+                setattr(case, field, new_val)
+                changed_fields.add(field)
 
         # Fecha
-        date_str = extracted_data.get('date')
-        new_date = None
-        if date_str:
-            from datetime import datetime
-            for fmt in ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y'):
-                try:
-                    new_date = datetime.strptime(date_str, fmt).date()
-                    break
-                except Exception:
-                    continue
-        if new_date and (is_internal or not case.surgery_date):
-            if case.surgery_date != new_date:
-                case.surgery_date = new_date
-
-            updated = True
-
-        case.city,         ch = _choose(case.city,         extracted_data.get('city'),       is_internal); updated |= ch
-        case.doctor_name,  ch = _choose(case.doctor_name,  extracted_data.get('doctor'),     is_internal); updated |= ch
-        case.procedure,    ch = _choose(case.procedure,    extracted_data.get('procedure'),  is_internal); updated |= ch
-
-        if updated:
-            case.save()
+        new_date = self._parse_date(extracted_data.get('date'))
+        if new_date and (is_internal or not case.surgery_date) and case.surgery_date != new_date:
+            case.surgery_date = new_date
+            changed_fields.add('surgery_date')
+
+        if changed_fields:
+            case.save(update_fields=changed_fields)
 
 
 class ReportGenerator:
@@ -258,9 +432,14 @@ class ReportGenerator:
         try:
             verification = case.verification
         except:
+            # Falló la extracción (ERROR) o la verificación (error registrado en los documentos)
+            has_errors = case.documents.filter(
+                Q(status=DocumentStatus.ERROR) | ~Q(processing_error='')
+            ).exists()
             return {
                 'error': 'Caso no verificado',
-                'case_id': str(case.id)
+                'case_id': str(case.id),
+                'status': 'error' if has_errors else 'processing'
             }
 
         report = {
@@ -411,12 +590,15 @@ class ReportGenerator:
         """Formatea información de documentos procesados"""
         documents_info = []
 
-        for doc in case.documents.all():
+        documents = case.documents.annotate(supplies_count=Count('supplies')).only(
+            'surgical_case', 'document_type', 'status', 'processed_at', 'processing_error'
+        )
+        for doc in documents:
             doc_info = {
                 'type': doc.get_document_type_display(),
                 'status': doc.get_status_display(),
                 'processed_at': doc.processed_at.isoformat() if doc.processed_at else None,
-                'supplies_count': doc.supplies.count(),
+                'supplies_count': doc.supplies_count,
                 'has_error': bool(doc.processing_error)
             }
 
@@ -431,9 +613,21 @@ class ReportGenerator:
 class EquivalenceManager:
     """Gestor de equivalencias de insumos - sistema de aprendizaje"""
 
+    _instance = None
+    _instance_lock = threading.Lock()
+
     def __init__(self):
         self.equivalence_model = SupplyEquivalence
 
+    @classmethod
+    def instance(cls) -> 'EquivalenceManager':
+        """Retorna una instancia compartida por proceso (el gestor no guarda estado por request)"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
     def add_equivalence(self, canonical_name: str, aliases: List[str],
                         user=None, is_auto=False) -> SupplyEquivalence:
         """Añade una nueva equivalencia o actualiza existente"""
@@ -442,35 +636,39 @@ class EquivalenceManager:
         canonical_clean = self._normalize_name(canonical_name)
         aliases_clean = [self._normalize_name(alias) for alias in aliases]
 
-        # Buscar equivalencia existente
-        equivalence, created = self.equivalence_model.objects.get_or_create(
-            canonical_name=canonical_clean,
-            defaults={
-                'aliases': aliases_clean,
-                'is_auto_generated': is_auto,
-                'validated_by': user,
-                'confidence_score': 0.8 if is_auto else 1.0
-            }
-        )
+        with transaction.atomic():
+            # Buscar equivalencia existente
+            equivalence, created = self.equivalence_model.objects.get_or_create(
+                canonical_name=canonical_clean,
+                defaults={
+                    'aliases': aliases_clean,
+                    'is_auto_generated': is_auto,
+                    'validated_by': user,
+                    'confidence_score': 0.8 if is_auto else 1.0
+                }
+            )
 
-        if not created:
-            # Actualizar aliases existentes
-            for alias in aliases_clean:
-                equivalence.add_alias(alias)
+            if not created:
+                # Actualizar aliases existentes (un solo UPDATE para todos los nuevos)
+                equivalence.add_aliases(aliases_clean)
 
-            if user and not equivalence.validated_by:
-                equivalence.validated_by = user
-                equivalence.confidence_score = 1.0
-                equivalence.save()
+                if user and not equivalence.validated_by_id:
+                    equivalence.validated_by = user
+                    equivalence.confidence_score = 1.0
+                    equivalence.save(update_fields=['validated_by', 'confidence_score'])
 
+        # El matcher de este proceso ve la equivalencia sin esperar al próximo chequeo
+        SupplyMatcher.expire_equivalences()
         return equivalence
 
     def suggest_equivalences(self, supply_names: List[str]) -> List[Dict]:
         """Sugiere equivalencias basadas en similitud de nombres"""
         suggestions = []
+        # Normalizar una sola vez; cada búsqueda compara contra la misma lista
+        normalized_names = [self._normalize_name(name) for name in supply_names]
 
         for name in supply_names:
-            similar_names = self._find_similar_names(name, supply_names)
+            similar_names = self._find_similar_names(name, supply_names, normalized_names)
             if len(similar_names) > 1:
                 suggestions.append({
                     'canonical_candidate': name,
@@ -482,55 +680,41 @@ class EquivalenceManager:
 
     def _normalize_name(self, name: str) -> str:
         """Normaliza nombre para equivalencias, quitando acentos y estandarizando tokens"""
+        return normalize_equivalence_name(name)
 
-        s = unicodedata.normalize('NFKD', name)
-        s = ''.join(c for c in s if not unicodedata.combining(c))
-        s = s.lower().strip()
-        s = s.replace('×', 'x')
-        s = re.sub(r'[^\w\s\d\.,x\-]', '', s)
-        s = re.sub(r'\s+', ' ', s)
-        s = re.sub(r'(\d+(?:\.\d+)?)\s*x\s*(\d+(?:\.\d+)?)', r'\1x\2', s)
-        replacements = {
-            'standard': 'estandar',
-        }
-        for old, new in replacements.items():
-            s = s.replace(old, new)
-        return s
-
-    def _find_similar_names(self, target_name: str, all_names: List[str]) -> List[str]:
+    def _find_similar_names(self, target_name: str, all_names: List[str],
+                            normalized_names: Optional[List[str]] = None) -> List[str]:
         """Encuentra nombres similares usando fuzzy matching (rapidfuzz)"""
 
-        similar = []
         target_normalized = self._normalize_name(target_name)
+        if normalized_names is None:
+            normalized_names = [self._normalize_name(name) for name in all_names]
 
-        for name in all_names:
-            if name == target_name:
-                continue
-
-            name_normalized = self._normalize_name(name)
-            similarity = fuzz.token_sort_ratio(target_normalized, name_normalized)
-
-            if similarity >= 80:
-                similar.append({'name': name, 'similarity': similarity})
-        similar.sort(key=lambda x: x['similarity'], reverse=True)
-        return [target_name] + [item['name'] for item in similar]
+        # Un solo llamado a rapidfuzz compara contra todos los nombres (ya ordenado por similitud)
+        matches = process.extract(
+            target_normalized, normalized_names, scorer=fuzz.token_sort_ratio,
+            score_cutoff=80, limit=None
+        )
+        return [target_name] + [
+            all_names[index] for _, _, index in matches if all_names[index] != target_name
+        ]
 
     def _calculate_similarity_confidence(self, similar_names: List[str]) -> float:
-        """Calcula confianza de la sugerencia de equivalencia"""
+        """Calcula confianza de la sugerencia de equivalencia (similitud promedio entre pares)"""
         if len(similar_names) < 2:
             return 0.0
 
-
+        normalized_names = [self._normalize_name(name) for name in similar_names]
         total_similarity = 0
         comparisons = 0
 
-        for i in range(len(similar_names)):
-            for j in range(i + 1, len(similar_names)):
-                name1_norm = self._normalize_name(similar_names[i])
-                name2_norm = self._normalize_name(similar_names[j])
-                similarity = fuzz.token_sort_ratio(name1_norm, name2_norm)
-                total_similarity += similarity
-                comparisons += 1
+        # Cada nombre contra los siguientes en un solo llamado (triángulo superior de la matriz)
+        for i, name in enumerate(normalized_names[:-1]):
+            matches = process.extract(
+                name, normalized_names[i + 1:], scorer=fuzz.token_sort_ratio, limit=None
+            )
+            total_similarity += sum(score for _, score, _ in matches)
+            comparisons += len(matches)
 
         return (total_similarity / comparisons) / 100.0 if comparisons > 0 else 0.0
 
@@ -555,8 +739,45 @@ def process_surgical_case_files(files_dict: Dict, user) -> SurgicalCase:
     """
 
     processor = DocumentProcessor()
+    return processor.process_surgical_case(_build_files_data(files_dict), user)
+
+
+def register_surgical_case_files(files_dict: Dict, user) -> SurgicalCase:
+    """
+    Función utilitaria para registrar un caso quirúrgico y guardar sus archivos
+    sin procesarlos (el procesamiento se encola con process_case_task)
+
+    Args:
+        files_dict: Misma estructura que en process_surgical_case_files
+        user: Usuario que sube los documentos
+
+    Returns:
+        SurgicalCase registrado
+    """
+
+    processor = DocumentProcessor()
+    return processor.register_surgical_case(_build_files_data(files_dict), user)
+
+
+def process_registered_case(case_id: str) -> SurgicalCase:
+    """
+    Función utilitaria para procesar y verificar un caso ya registrado
+
+    Args:
+        case_id: UUID del caso
+
+    Returns:
+        SurgicalCase procesado
+    """
+
+    case = SurgicalCase.objects.get(id=case_id)
+    processor = DocumentProcessor()
+
+    return processor.process_registered_case(case)
 
-    # Convertir dict a formato esperado
+
+def _build_files_data(files_dict: Dict) -> List[Dict]:
+    """Convierte el dict de archivos por tipo al formato esperado por DocumentProcessor"""
     files_data = []
     for doc_type in ['internal', 'hospital', 'description']:
         if doc_type in files_dict:
@@ -565,8 +786,7 @@ def process_surgical_case_files(files_dict: Dict, user) -> SurgicalCase:
                 'document_type': doc_type,
                 'case_data': files_dict.get('case_data', {})
             })
-
-    return processor.process_surgical_case(files_data, user)
+    return files_data
 
 
 def generate_case_report(case_id: str) -> Dict:
@@ -581,12 +801,50 @@ def generate_case_report(case_id: str) -> Dict:
     """
     from django.shortcuts import get_object_or_404
 
-    case = get_object_or_404(SurgicalCase, id=case_id)
+    case = get_object_or_404(SurgicalCase.objects.select_related('verification'), id=case_id)
     reporter = ReportGenerator()
 
     return reporter.generate_verification_report(case)
 
 
+def get_case_report_version(case_id: str) -> Optional[Tuple[str, datetime]]:
+    """
+    Calcula la versión del reporte de un caso verificado sin generarlo
+
+    Args:
+        case_id: UUID del caso
+
+    Returns:
+        Tuple (etag, last_modified) o None si el caso no existe o aún no
+        tiene verificación
+    """
+    # El reporte incluye el estado de los documentos: también versionan el ETag
+    row = (
+        SurgicalCase.objects.filter(id=case_id)
+        .annotate(documents_modified=Max('documents__modified'))
+        .values_list('modified', 'verification__modified', 'documents_modified')
+        .first()
+    )
+    if row is None or row[1] is None:
+        return None
+
+    modified = [value for value in row if value is not None]
+    etag = hashlib.md5(
+        f"{case_id}:{':'.join(value.isoformat() for value in modified)}".encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+    return etag, max(modified)
+
+
+def get_cached_case_report(case_id: str, etag: str) -> Dict:
+    """Retorna el reporte de la versión `etag` del caso, generándolo solo si no está en caché"""
+    return cache.get_or_set(
+        f"case_report:{case_id}:{etag}",
+        lambda: generate_case_report(case_id),
+        REPORT_CACHE_TIMEOUT
+    )
+
+
 def suggest_supply_equivalences(case_id: str) -> List[Dict]:
     """
     Función utilitaria para sugerir equivalencias de insumos
@@ -600,11 +858,11 @@ def suggest_supply_equivalences(case_id: str) -> List[Dict]:
     from django.shortcuts import get_object_or_404
 
     case = get_object_or_404(SurgicalCase, id=case_id)
-    manager = EquivalenceManager()
+    manager = EquivalenceManager.instance()
 
-    # Obtener todos los nombres de insumos del caso
-    supply_names = []
-    for doc in case.documents.all():
-        supply_names.extend([supply.name for supply in doc.supplies.all()])
+    # Obtener todos los nombres de insumos del caso en una sola consulta
+    supply_names = list(
+        Supply.objects.filter(document__surgical_case=case).values_list('name', flat=True)
+    )
 
     return manager.suggest_equivalences(supply_names)
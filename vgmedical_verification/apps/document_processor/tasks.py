@@ -0,0 +1,20 @@
+import logging
+
+from celery import shared_task
+
+from .services.services import DocumentProcessingError
+from .services.services import process_registered_case
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, acks_late=True)
+def process_case_task(self, case_id):
+    """Procesa (OCR + parsing) y verifica en segundo plano un caso ya registrado."""
+    try:
+        case = process_registered_case(case_id)
+    except DocumentProcessingError as e:
+        # El error queda registrado en los documentos; reintentar no lo corrige
+        logger.warning(f"Caso {case_id} no pudo procesarse: {str(e)}")
+        return {'case_id': str(case_id), 'status': 'error', 'detail': str(e)}
+    return {'case_id': str(case.id), 'status': 'processed'}
@@ -1,12 +1,12 @@
 from django.test import TestCase
 from django.urls import reverse
-from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
 from rest_framework.test import APITestCase
 from rest_framework import status
 from unittest.mock import patch, Mock
 
 from vgmedical_verification.users.tests.factories import UserFactory
-from .factories import SurgicalCaseFactory, VerificationResultFactory
+from .factories import DocumentFactory, SurgicalCaseFactory, VerificationResultFactory
 
 
 class TestCaseIngestAPI(APITestCase):
@@ -23,19 +23,56 @@ class TestCaseIngestAPI(APITestCase):
             'description': SimpleUploadedFile('description.pdf', b'Description content', content_type='application/pdf')
         }
 
-    @patch('vgmedical_verification.apps.document_processor.api.views.document_processor.process_surgical_case_files')
-    def test_ingest_case_success(self, mock_process_function):
+    @patch('vgmedical_verification.apps.document_processor.api.views.document_processor.process_case_task')
+    @patch('vgmedical_verification.apps.document_processor.api.views.document_processor.register_surgical_case_files')
+    def test_ingest_case_success(self, mock_register_function, mock_task):
         # Mock del resultado
         mock_case = SurgicalCaseFactory()
-        mock_process_function.return_value = mock_case
+        mock_register_function.return_value = mock_case
         
         files = self.create_test_files()
         data = {**files, 'case_data': '{"patient_name": "Test Patient"}'}
 
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.ingest_url, data, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['case_id'], str(mock_case.id))
+        self.assertEqual(response.data['status'], 'queued')
+        mock_task.delay.assert_called_once_with(str(mock_case.id))
+
+    @patch('vgmedical_verification.apps.document_processor.api.views.document_processor.process_case_task')
+    @patch('vgmedical_verification.apps.document_processor.api.views.document_processor.register_surgical_case_files')
+    def test_ingest_case_streams_files_to_disk(self, mock_register_function, mock_task):
+        mock_register_function.return_value = SurgicalCaseFactory()
+
+        response = self.client.post(self.ingest_url, self.create_test_files(), format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        files_dict = mock_register_function.call_args[0][0]
+        for key in ('internal', 'hospital', 'description'):
+            self.assertIsInstance(files_dict[key], TemporaryUploadedFile)
+
+    @patch('vgmedical_verification.apps.document_processor.api.views.document_processor.process_case_task')
+    @patch('vgmedical_verification.apps.document_processor.api.views.document_processor.register_surgical_case_files')
+    def test_ingest_case_returns_warnings(self, mock_register_function, mock_task):
+        mock_register_function.return_value = SurgicalCaseFactory()
+        data = {**self.create_test_files(), 'case_data': '{"patient_id": "ABC-12"}'}
+
         response = self.client.post(self.ingest_url, data, format='multipart')
 
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertIn('case_id', response.data)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(len(response.data['warnings']), 1)
+        self.assertEqual(mock_register_function.call_args[0][0]['case_data'], {'patient_id': 'ABC-12'})
+
+    def test_ingest_case_unsupported_file_type(self):
+        files = self.create_test_files()
+        files['hospital'] = SimpleUploadedFile('hospital.docx', b'Hospital content')
+
+        response = self.client.post(self.ingest_url, files, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {'hospital'})
 
     def test_ingest_case_missing_file(self):
         data = {'internal': SimpleUploadedFile('internal.pdf', b'content', content_type='application/pdf')}
@@ -44,6 +81,27 @@ class TestCaseIngestAPI(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_ingest_case_errors_render_with_orjson(self):
+        from vgmedical_verification.apps.document_processor.api.renderers import ORJSONRenderer
+        data = {'internal': SimpleUploadedFile('internal.pdf', b'content', content_type='application/pdf')}
+
+        response = self.client.post(self.ingest_url, data, format='multipart')
+
+        self.assertIsInstance(response.accepted_renderer, ORJSONRenderer)
+        self.assertIn('hospital', response.json())
+
+    @patch('vgmedical_verification.apps.document_processor.api.validators.MAX_UPLOAD_BYTES', 10)
+    def test_ingest_case_reports_all_oversized_files(self):
+        response = self.client.post(self.ingest_url, self.create_test_files(), format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {'internal', 'hospital', 'description'})
+
+    def test_ingest_case_rejects_json_body(self):
+        response = self.client.post(self.ingest_url, {'case_data': {}}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
 
 class TestCaseReportAPI(APITestCase):
 
@@ -60,3 +118,48 @@ class TestCaseReportAPI(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['case_id'], str(self.case.id))
         self.assertIn('verification_score', response.data)
+
+    def test_get_case_report_renders_json(self):
+        response = self.client.get(self.report_url)
+
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json()['case_id'], str(self.case.id))
+
+    def test_get_case_report_not_modified(self):
+        response = self.client.get(self.report_url)
+        etag = response['ETag']
+
+        response = self.client.get(self.report_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_get_case_report_etag_changes_with_verification(self):
+        etag = self.client.get(self.report_url)['ETag']
+
+        self.verification.verification_score = 50.0
+        self.verification.save()
+        response = self.client.get(self.report_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['verification_score'], 50.0)
+
+    def test_get_case_report_etag_changes_with_documents(self):
+        document = DocumentFactory(surgical_case=self.case)
+        etag = self.client.get(self.report_url)['ETag']
+
+        document.processing_error = 'Error verificando caso'
+        document.save()
+        response = self.client.get(self.report_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_get_case_report_while_processing(self):
+        case = SurgicalCaseFactory()
+        url = reverse('api:document_processor:cases-report', kwargs={'case_id': case.id})
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'processing')
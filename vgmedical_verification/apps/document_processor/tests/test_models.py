@@ -2,7 +2,8 @@
 
 from django.test import TestCase
 from django.core.exceptions import ValidationError
-from datetime import date
+from datetime import date, timedelta
+from django.utils import timezone
 
 from vgmedical_verification.apps.document_processor.models import (
     SurgicalCase, Document, Supply, SupplyEquivalence, VerificationResult,
@@ -19,7 +20,7 @@ class TestSurgicalCaseModel(TestCase):
 
     def test_surgical_case_str_representation(self):
         """Test surgical case string representation."""
-        case = SurgicalCaseFactory(
+        case = SurgicalCaseFactory.build(
             case_number="VG_20240101_0001",
             patient_name="Juan Pérez"
         )
@@ -36,22 +37,28 @@ class TestSurgicalCaseModel(TestCase):
 
     def test_surgical_case_ordering(self):
         """Test surgical case ordering."""
-        case1 = SurgicalCaseFactory()
-        case2 = SurgicalCaseFactory()
-        case3 = SurgicalCaseFactory()
+        now = timezone.now()
+        with self.assertNumQueries(1):
+            case1, case2, case3 = SurgicalCase.objects.bulk_create([
+                SurgicalCaseFactory.build(created=now + timedelta(seconds=i)) for i in range(3)
+            ])
         
-        cases = SurgicalCase.objects.all()
-        self.assertEqual(list(cases), [case3, case2, case1])  # Ordered by -created
+        with self.assertNumQueries(1):
+            cases = list(SurgicalCase.objects.select_related('verification'))
+        self.assertEqual(cases, [case3, case2, case1])  # Ordered by -created
 
 
 class TestDocumentModel(TestCase):
     """Test Document model."""
 
+    @classmethod
+    def setUpTestData(cls):
+        cls.case = SurgicalCaseFactory(case_number="VG_20240101_0001")
+
     def test_document_str_representation(self):
         """Test document string representation."""
-        case = SurgicalCaseFactory(case_number="VG_20240101_0001")
-        document = DocumentFactory(
-            surgical_case=case,
+        document = DocumentFactory.build(
+            surgical_case=self.case,
             document_type=DocumentType.INTERNAL
         )
         expected = "Reporte Interno - VG_20240101_0001"
@@ -59,51 +66,55 @@ class TestDocumentModel(TestCase):
 
     def test_document_unique_constraint(self):
         """Test document unique constraint (case + document_type)."""
-        case = SurgicalCaseFactory()
-        DocumentFactory(surgical_case=case, document_type=DocumentType.INTERNAL)
+        DocumentFactory(surgical_case=self.case, document_type=DocumentType.INTERNAL)
         
         with self.assertRaises(Exception):  # Should raise IntegrityError
-            DocumentFactory(surgical_case=case, document_type=DocumentType.INTERNAL)
+            DocumentFactory(surgical_case=self.case, document_type=DocumentType.INTERNAL)
 
     def test_document_status_default(self):
         """Test document status default value."""
-        document = DocumentFactory()
+        document = DocumentFactory(surgical_case=self.case)
         self.assertEqual(document.status, DocumentStatus.PROCESSED)  # Factory sets PROCESSED
 
     def test_document_related_surgical_case(self):
         """Test document related surgical case."""
-        case = SurgicalCaseFactory()
-        document = DocumentFactory(surgical_case=case)
+        document = DocumentFactory(surgical_case=self.case)
         
-        self.assertEqual(document.surgical_case, case)
-        self.assertIn(document, case.documents.all())
+        self.assertEqual(document.surgical_case, self.case)
+        # 1 consulta para el caso + 1 para todos sus documentos
+        with self.assertNumQueries(2):
+            case = SurgicalCase.objects.prefetch_related('documents').get(pk=self.case.pk)
+            self.assertIn(document, list(case.documents.all()))
 
 
 class TestSupplyModel(TestCase):
     """Test Supply model."""
 
+    @classmethod
+    def setUpTestData(cls):
+        cls.document = DocumentFactory()
+
     def test_supply_str_representation(self):
         """Test supply string representation."""
-        supply = SupplyFactory(name="Tornillo encefálico 3.5x55mm", quantity=2)
+        supply = SupplyFactory.build(name="Tornillo encefálico 3.5x55mm", quantity=2)
         expected = "Tornillo encefálico 3.5x55mm (x2)"
         self.assertEqual(str(supply), expected)
 
     def test_supply_related_document(self):
         """Test supply related document."""
-        document = DocumentFactory()
-        supply = SupplyFactory(document=document)
+        supply = SupplyFactory(document=self.document)
         
-        self.assertEqual(supply.document, document)
-        self.assertIn(supply, document.supplies.all())
+        self.assertEqual(supply.document, self.document)
+        self.assertIn(supply, self.document.supplies.all())
 
     def test_supply_udi_label_default(self):
         """Test supply UDI label default value."""
-        supply = SupplyFactory()
+        supply = SupplyFactory(document=self.document)
         self.assertTrue(supply.udi_label_present)  # Factory sets True
 
     def test_supply_confidence_default(self):
         """Test supply confidence default value."""
-        supply = SupplyFactory()
+        supply = SupplyFactory(document=self.document)
         self.assertEqual(supply.confidence, 0.0)
 
 
@@ -112,7 +123,7 @@ class TestSupplyEquivalenceModel(TestCase):
 
     def test_supply_equivalence_str_representation(self):
         """Test supply equivalence string representation."""
-        equivalence = SupplyEquivalenceFactory(canonical_name="tornillo encefalico")
+        equivalence = SupplyEquivalenceFactory.build(canonical_name="tornillo encefalico")
         self.assertEqual(str(equivalence), "tornillo encefalico")
 
     def test_supply_equivalence_canonical_name_unique(self):
@@ -125,22 +136,22 @@ class TestSupplyEquivalenceModel(TestCase):
 
     def test_supply_equivalence_aliases_default(self):
         """Test supply equivalence aliases default value."""
-        equivalence = SupplyEquivalenceFactory()
+        equivalence = SupplyEquivalenceFactory.build()
         self.assertIsInstance(equivalence.aliases, list)  # Factory sets aliases
 
     def test_supply_equivalence_confidence_default(self):
         """Test supply equivalence confidence default value."""
-        equivalence = SupplyEquivalenceFactory()
+        equivalence = SupplyEquivalenceFactory.build()
         self.assertGreaterEqual(equivalence.confidence_score, 0.0)  # Factory sets random value
 
     def test_supply_equivalence_times_used_default(self):
         """Test supply equivalence times used default value."""
-        equivalence = SupplyEquivalenceFactory()
+        equivalence = SupplyEquivalenceFactory.build()
         self.assertEqual(equivalence.times_used, 0)
 
     def test_supply_equivalence_is_auto_generated_default(self):
         """Test supply equivalence is auto generated default value."""
-        equivalence = SupplyEquivalenceFactory()
+        equivalence = SupplyEquivalenceFactory.build()
         self.assertFalse(equivalence.is_auto_generated)
 
     def test_add_alias_method(self):
@@ -155,14 +166,25 @@ class TestSupplyEquivalenceModel(TestCase):
         equivalence.add_alias("alias2")
         self.assertEqual(len(equivalence.aliases), original_count)
 
+    def test_add_alias_persists_atomically(self):
+        """Test add_alias appends in the database without a full save."""
+        equivalence = SupplyEquivalenceFactory(aliases=["alias1"])
+
+        with self.assertNumQueries(1):
+            equivalence.add_alias("alias2")
+        equivalence.add_alias("ALIAS2")
+
+        equivalence.refresh_from_db()
+        self.assertEqual(equivalence.aliases, ["alias1", "alias2"])
+
 
 class TestVerificationResultModel(TestCase):
     """Test VerificationResult model."""
 
     def test_verification_result_str_representation(self):
         """Test verification result string representation."""
-        case = SurgicalCaseFactory(case_number="VG_20240101_0001")
-        result = VerificationResultFactory(surgical_case=case)
+        case = SurgicalCaseFactory.build(case_number="VG_20240101_0001")
+        result = VerificationResultFactory.build(surgical_case=case)
         expected = "Verificación VG_20240101_0001"
         self.assertEqual(str(result), expected)
 
@@ -171,8 +193,9 @@ class TestVerificationResultModel(TestCase):
         case = SurgicalCaseFactory()
         result = VerificationResultFactory(surgical_case=case)
         
-        self.assertEqual(result.surgical_case, case)
-        self.assertEqual(case.verification, result)
+        with self.assertNumQueries(0):
+            self.assertEqual(result.surgical_case, case)
+            self.assertEqual(case.verification, result)
 
     def test_verification_result_default_values(self):
         """Test verification result default values."""
@@ -220,3 +243,14 @@ class TestVerificationResultModel(TestCase):
             requires_review=False
         )
         self.assertEqual(result.overall_status, "RECHAZADO")
+
+    def test_overall_status_stored_in_database(self):
+        """Test overall status is materialized and filterable in the database."""
+        result = VerificationResultFactory(supplies_match=False, requires_review=True)
+        self.assertTrue(VerificationResult.objects.filter(overall_status="REQUIERE_REVISION").exists())
+
+        result.requires_review = False
+        result.save()
+        # PostgreSQL recalcula la columna; la instancia se recarga para verla
+        result.refresh_from_db(fields=['overall_status'])
+        self.assertEqual(result.overall_status, "RECHAZADO")
@@ -1,10 +1,15 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.core.files.base import ContentFile
 from unittest.mock import patch, Mock
 
+from vgmedical_verification.apps.document_processor.models import DocumentType, SurgicalCase, Supply
 from vgmedical_verification.apps.document_processor.services.services import (
-    DocumentProcessor, EquivalenceManager, process_surgical_case_files
+    DocumentProcessor, DocumentProcessingError, EquivalenceManager, generate_case_report,
+    process_surgical_case_files, suggest_supply_equivalences
 )
+from vgmedical_verification.apps.verification.engine import SupplyMatcher
 from vgmedical_verification.users.tests.factories import UserFactory
 
 
@@ -49,10 +54,80 @@ class TestDocumentProcessor(TestCase):
             from .factories import VerificationResultFactory
             mock_verify.return_value = VerificationResultFactory()
 
-            result = self.processor.process_surgical_case(files_data, self.user)
+            # SAVEPOINT/RELEASE + 1 caso + 2 por documento (INSERT + UPDATE) + 1 insumos
+            with CaptureQueriesContext(connection) as queries, self.assertNumQueries(10):
+                result = self.processor.process_surgical_case(files_data, self.user)
             self.assertIsNotNone(result)
             self.assertEqual(result.documents.count(), 3)
 
+        # Los insumos de los 3 documentos se insertan juntos
+        supply_inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "document_processor_supply"')]
+        self.assertEqual(len(supply_inserts), 1)
+        # Sin lecturas por documento (N+1)
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT')])
+        self.assertEqual(Supply.objects.filter(document__surgical_case=result).count(), 3)
+
+    @patch('vgmedical_verification.apps.document_processor.services.services.DocumentParserFactory')
+    def test_process_surgical_case_parse_error_creates_nothing(self, mock_parser_factory):
+        mock_parser_factory.get_parser.return_value.parse_file.side_effect = Exception('PDF corrupto')
+
+        with self.assertRaises(DocumentProcessingError):
+            self.processor.process_surgical_case(self.create_mock_files(), self.user)
+
+        self.assertFalse(SurgicalCase.objects.exists())
+
+    def test_create_supplies_single_insert(self):
+        from .factories import DocumentFactory
+        document = DocumentFactory()
+        supplies_data = [{'name': f'Insumo {i}', 'quantity': i + 1} for i in range(5)]
+
+        with self.assertNumQueries(1):
+            self.processor._create_supplies(self.processor._build_supplies(document, supplies_data))
+
+        self.assertEqual(document.supplies.count(), 5)
+
+    def test_update_case_data_writes_only_changed_fields(self):
+        from .factories import DocumentFactory
+        document = DocumentFactory(document_type=DocumentType.HOSPITAL)
+        case = document.surgical_case
+        case.city = ''
+        original_name = case.patient_name
+
+        with CaptureQueriesContext(connection) as queries:
+            self.processor._update_case_data(case, document, {'patient_name': 'Otro', 'city': 'Bogotá'})
+
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"city"', queries[0]['sql'])
+        self.assertNotIn('"patient_name"', queries[0]['sql'])
+        case.refresh_from_db()
+        self.assertEqual((case.patient_name, case.city), (original_name, 'Bogotá'))
+
+    def test_update_case_data_internal_document_overrides(self):
+        from .factories import DocumentFactory
+        document = DocumentFactory(document_type=DocumentType.INTERNAL)
+        case = document.surgical_case
+
+        with self.assertNumQueries(0):
+            self.processor._update_case_data(case, document, {'patient_name': case.patient_name, 'city': ''})
+        self.processor._update_case_data(case, document, {'doctor': 'Dr. Pérez'})
+
+        case.refresh_from_db()
+        self.assertEqual(case.doctor_name, 'Dr. Pérez')
+
+    def test_generate_case_number_format(self):
+        from vgmedical_verification.apps.document_processor.admin import CASE_NUMBER_PATTERN
+        case_number = self.processor._generate_case_number()
+        self.assertRegex(case_number, CASE_NUMBER_PATTERN)
+        self.assertNotEqual(case_number, self.processor._generate_case_number())
+
+    def test_parse_date_formats(self):
+        from datetime import date
+        self.assertEqual(self.processor._parse_date('2024-01-15'), date(2024, 1, 15))
+        self.assertEqual(self.processor._parse_date('15/01/2024'), date(2024, 1, 15))
+        self.assertEqual(self.processor._parse_date('15-01-2024'), date(2024, 1, 15))
+        self.assertIsNone(self.processor._parse_date('31/02/2024'))
+        self.assertIsNone(self.processor._parse_date(None))
+
 
 class TestEquivalenceManager(TestCase):
 
@@ -68,3 +143,88 @@ class TestEquivalenceManager(TestCase):
 
         self.assertEqual(equivalence.canonical_name, canonical.lower())
         self.assertEqual(len(equivalence.aliases), 2)
+
+    def test_add_equivalence_visible_to_matcher_immediately(self):
+        SupplyMatcher()
+        self.manager.add_equivalence("tornillo encefalico 3.5x55mm", ["tornillo 3.5x55"], self.user)
+
+        self.assertIn("tornillo encefalico 3.5x55mm", SupplyMatcher().equivalences)
+
+    def test_add_equivalence_existing_merges_aliases_in_one_update(self):
+        canonical = "tornillo encefalico 3.5x55mm"
+        self.manager.add_equivalence(canonical, ["tornillo 3.5x55"], self.user)
+
+        # SAVEPOINT + SELECT + 1 UPDATE para todos los aliases nuevos + RELEASE
+        with self.assertNumQueries(4):
+            equivalence = self.manager.add_equivalence(
+                canonical, ["tornillo 3.5x55", "screw 3.5x55", "Screw 3.5x55", "tornillo ts 3.5"], self.user
+            )
+
+        equivalence.refresh_from_db()
+        self.assertEqual(equivalence.aliases, ["tornillo 3.5x55", "screw 3.5x55", "tornillo ts 3.5"])
+
+    def test_instance_is_shared(self):
+        self.assertIs(EquivalenceManager.instance(), EquivalenceManager.instance())
+
+    def test_normalize_name(self):
+        self.assertEqual(
+            self.manager._normalize_name('Tornillo  Estándar 3.5 × 20mm!'),
+            'tornillo estandar 3.5x20mm'
+        )
+
+    def test_suggest_equivalences_groups_similar_names(self):
+        names = ['Tornillo Cortical 3.5 x 20mm', 'tornillo cortical 3.5x20 mm', 'Placa bloqueada']
+
+        suggestions = self.manager.suggest_equivalences(names)
+
+        self.assertEqual([s['canonical_candidate'] for s in suggestions], names[:2])
+        self.assertEqual(suggestions[0]['similar_names'], names[:2])
+        self.assertEqual(
+            self.manager._find_similar_names(names[0], names),
+            suggestions[0]['similar_names']
+        )
+
+    def test_normalize_name_outside_accents_table(self):
+        # Caracteres fuera de la tabla de acentos pasan por NFKD
+        self.assertEqual(self.manager._normalize_name('Cánula Çurva ﬁna'), 'canula curva fina')
+
+    def test_normalize_name_already_normalized(self):
+        name = 'tornillo cortical 3.5x20mm'
+        self.assertIs(self.manager._normalize_name(name), name)
+        self.assertEqual(self.manager._normalize_name('placa 3 x 4 standard'), 'placa 3x4 estandar')
+
+
+class TestSuggestSupplyEquivalences(TestCase):
+
+    def test_suggestions_load_supply_names_in_one_query(self):
+        from .factories import DocumentFactory, SupplyFactory, SurgicalCaseFactory
+        case = SurgicalCaseFactory()
+        internal = DocumentFactory(surgical_case=case, document_type=DocumentType.INTERNAL)
+        hospital = DocumentFactory(surgical_case=case, document_type=DocumentType.HOSPITAL)
+        SupplyFactory(document=internal, name='Tornillo encefálico 3.5x55mm')
+        SupplyFactory(document=hospital, name='Tornillo encefalico 3.5 x 55mm')
+
+        # 1 consulta para el caso + 1 para todos los nombres de insumos
+        with self.assertNumQueries(2):
+            suggestions = suggest_supply_equivalences(str(case.id))
+
+        self.assertEqual(len(suggestions), 2)
+
+
+class TestGenerateCaseReport(TestCase):
+
+    def test_report_query_count_does_not_grow_with_documents(self):
+        from .factories import (
+            DocumentFactory, SupplyFactory, SurgicalCaseFactory, VerificationResultFactory
+        )
+        case = SurgicalCaseFactory()
+        VerificationResultFactory(surgical_case=case)
+        for document_type in (DocumentType.INTERNAL, DocumentType.HOSPITAL, DocumentType.DESCRIPTION):
+            document = DocumentFactory(surgical_case=case, document_type=document_type)
+            SupplyFactory.create_batch(2, document=document)
+
+        # 1 consulta para caso + verificación, 1 para documentos con su conteo de insumos
+        with self.assertNumQueries(2):
+            report = generate_case_report(str(case.id))
+
+        self.assertEqual([doc['supplies_count'] for doc in report['documents']], [2, 2, 2])
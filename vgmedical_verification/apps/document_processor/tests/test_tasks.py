@@ -0,0 +1,89 @@
+from django.core.files.base import ContentFile
+from django.test import TestCase
+from unittest.mock import patch, Mock
+
+from vgmedical_verification.apps.document_processor.models import DocumentStatus, Supply
+from vgmedical_verification.apps.document_processor.services.services import (
+    DocumentProcessor,
+    generate_case_report,
+    register_surgical_case_files,
+)
+from vgmedical_verification.apps.document_processor.tasks import process_case_task
+from vgmedical_verification.users.tests.factories import UserFactory
+
+
+class TestProcessCaseTask(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.case = register_surgical_case_files({
+            'internal': ContentFile(b'Internal content', name='internal.pdf'),
+            'hospital': ContentFile(b'Hospital content', name='hospital.pdf'),
+            'description': ContentFile(b'Description content', name='description.pdf'),
+            'case_data': {'patient_name': 'Test Patient'},
+        }, self.user)
+
+    def test_register_stores_documents_unprocessed(self):
+        self.assertEqual(self.case.documents.count(), 3)
+        self.assertFalse(self.case.documents.exclude(status=DocumentStatus.UPLOADED).exists())
+
+    @patch('vgmedical_verification.apps.document_processor.services.services.DocumentParserFactory')
+    def test_process_case_task_verifies_case(self, mock_parser_factory):
+        mock_parser = Mock()
+        mock_parser.parse_file.return_value = {
+            'patient_name': 'Test Patient',
+            'raw_text': 'Sample text',
+            'supplies': [{'name': 'Test Supply', 'quantity': 1}]
+        }
+        mock_parser_factory.get_parser.return_value = mock_parser
+
+        result = process_case_task.apply(args=[str(self.case.id)]).get()
+
+        self.assertEqual(result['status'], 'processed')
+        self.assertEqual(self.case.documents.filter(status=DocumentStatus.PROCESSED).count(), 3)
+        self.case.refresh_from_db()
+        self.assertIsNotNone(self.case.verification)
+
+    @patch('vgmedical_verification.apps.document_processor.services.services.DocumentParserFactory')
+    def test_process_case_task_records_errors(self, mock_parser_factory):
+        mock_parser_factory.get_parser.return_value.parse_file.side_effect = Exception('OCR falló')
+
+        result = process_case_task.apply(args=[str(self.case.id)]).get()
+
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(self.case.documents.filter(status=DocumentStatus.ERROR).count(), 3)
+
+    @patch('vgmedical_verification.apps.document_processor.services.services.VerificationEngine.verify_case')
+    @patch('vgmedical_verification.apps.document_processor.services.services.DocumentParserFactory')
+    def test_process_case_task_verification_error_keeps_extraction(self, mock_parser_factory, mock_verify):
+        mock_parser_factory.get_parser.return_value.parse_file.return_value = {
+            'raw_text': 'Sample text',
+            'supplies': [{'name': 'Test Supply', 'quantity': 1}]
+        }
+        mock_verify.side_effect = Exception('Fallo de verificación')
+
+        result = process_case_task.apply(args=[str(self.case.id)]).get()
+
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(self.case.documents.filter(status=DocumentStatus.PROCESSED).count(), 3)
+        self.assertEqual(self.case.documents.filter(supplies__isnull=False).count(), 3)
+        self.assertEqual(generate_case_report(str(self.case.id))['status'], 'error')
+
+        # Reintento: la verificación pasa y el reporte deja de estar en error
+        mock_verify.side_effect = None
+        process_case_task.apply(args=[str(self.case.id)]).get()
+        self.assertFalse(self.case.documents.exclude(processing_error='').exists())
+
+    @patch('vgmedical_verification.apps.document_processor.services.services.DocumentParserFactory')
+    def test_process_registered_case_twice_keeps_supplies(self, mock_parser_factory):
+        mock_parser_factory.get_parser.return_value.parse_file.return_value = {
+            'raw_text': 'Sample text',
+            'supplies': [{'name': 'Test Supply', 'quantity': 1}]
+        }
+        service = DocumentProcessor()
+
+        service.process_registered_case(self.case)
+        service.process_registered_case(self.case)
+
+        self.assertEqual(Supply.all_objects.filter(document__surgical_case=self.case).count(), 3)
+        self.assertEqual(self.case.documents.filter(status=DocumentStatus.PROCESSED).count(), 3)
@@ -1,23 +1,126 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
+from unittest.mock import patch
+
 from vgmedical_verification.apps.verification.engine import (
-    SupplyMatcher, VerificationEngine
+    BasicDataVerifier, SupplyMatcher, VerificationEngine
+)
+from vgmedical_verification.apps.document_processor.models import (
+    Document, DocumentType, Supply, SupplyEquivalence, SurgicalCase, VerificationResult
 )
-from vgmedical_verification.apps.document_processor.models import DocumentType
-from .factories import SurgicalCaseFactory, SupplyEquivalenceFactory
+from .factories import DocumentFactory, SurgicalCaseFactory, SupplyEquivalenceFactory, SupplyFactory
 
 
-class TestSupplyMatcher(TestCase):
+class TestSupplyMatcherNormalization(SimpleTestCase):
 
     def setUp(self):
-        self.matcher = SupplyMatcher()
+        with patch.object(SupplyMatcher, '_get_equivalences', return_value=({}, {}, {})):
+            self.matcher = SupplyMatcher()
+
+    def test_normalize_name(self):
+        result = self.matcher._normalize_name("Tornillo Encefálico 3.5x55mm")
+        self.assertEqual(result, "tornillo encefalico 3.5x55mm")
+
+    def test_normalize_name_dimensions_and_tokens(self):
+        result = self.matcher._normalize_name("Placa Standard 3 × 4 x 5!")
+        self.assertEqual(result, "placa estandar 3x4x5")
+
+
+class TestBasicDataVerifier(SimpleTestCase):
+
+    def setUp(self):
+        self.verifier = BasicDataVerifier()
+
+    def test_normalize_person_name(self):
+        result = self.verifier._normalize_name("Dra.  José Pérez ")
+        self.assertEqual(result, "JOSE PEREZ")
+
+    def test_verify_name_field_similar_names(self):
+        values = {
+            DocumentType.INTERNAL: "Dr. José Pérez Gómez",
+            DocumentType.HOSPITAL: "JOSE PEREZ GOMEZ",
+            DocumentType.DESCRIPTION: "José Perez Gomes",
+        }
+        result = self.verifier._verify_name_field('doctor', values)
+        self.assertTrue(result['match'])
+
+    def test_verify_name_field_different_names(self):
+        values = {
+            DocumentType.INTERNAL: "José Pérez",
+            DocumentType.HOSPITAL: "José Pérez",
+            DocumentType.DESCRIPTION: "María Rodríguez",
+        }
+        result = self.verifier._verify_name_field('patient_name', values)
+        self.assertFalse(result['match'])
+        self.assertIn('discrepancy', result)
+
+    def test_verify_field_unknown(self):
+        values = dict.fromkeys((DocumentType.INTERNAL, DocumentType.HOSPITAL, DocumentType.DESCRIPTION), 'x')
+        result = self.verifier._verify_field('weight', values)
+        self.assertFalse(result['match'])
+        self.assertEqual(result['discrepancy'], 'Tipo de campo desconocido: weight')
+
+    def test_verify_procedure_field(self):
+        values = {
+            DocumentType.INTERNAL: "Osteosíntesis de fémur",
+            DocumentType.HOSPITAL: "OSTEOSÍNTESIS DE FÉMUR DERECHO",
+            DocumentType.DESCRIPTION: "",
+        }
+        self.assertTrue(self.verifier._verify_procedure_field(values)['match'])
+
+        values[DocumentType.DESCRIPTION] = "Artroscopia de rodilla"
+        self.assertFalse(self.verifier._verify_procedure_field(values)['match'])
+
+    def test_verify_id_field_ignores_separators(self):
+        values = {
+            DocumentType.INTERNAL: "1.023.456.789",
+            DocumentType.HOSPITAL: "1023456789",
+            DocumentType.DESCRIPTION: "CC 1023-456 789",
+        }
+        self.assertTrue(self.verifier._verify_id_field(values)['match'])
+
+        values[DocumentType.DESCRIPTION] = "1023456780"
+        self.assertFalse(self.verifier._verify_id_field(values)['match'])
+
+
+class TestSupplyMatcher(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
         SupplyEquivalenceFactory(
             canonical_name="tornillo encefalico 3.5x55mm",
             aliases=["tornillo encefalico 3.5x55mm", "tornillo 3.5x55"]
         )
 
-    def test_normalize_name(self):
-        result = self.matcher._normalize_name("Tornillo Encefálico 3.5x55mm")
-        self.assertEqual(result, "tornillo encefalico 3.5x55mm")
+    def setUp(self):
+        self.matcher = SupplyMatcher()
+
+    def test_equivalences_loaded_on_first_use(self):
+        SupplyMatcher._equivalences_cache = None
+        # versión de la tabla + carga
+        with self.assertNumQueries(2):
+            matcher = SupplyMatcher()
+        self.assertEqual(
+            matcher.equivalences,
+            {"tornillo encefalico 3.5x55mm": ["tornillo encefalico 3.5x55mm", "tornillo 3.5x55"]}
+        )
+
+    def test_equivalences_reloaded_only_when_table_changes(self):
+        # Dentro del intervalo de chequeo ni siquiera se consulta la versión
+        with self.assertNumQueries(0):
+            matcher = SupplyMatcher()
+        self.assertIs(matcher.alias_index, self.matcher.alias_index)
+
+        SupplyMatcher.expire_equivalences()
+        with self.assertNumQueries(1):
+            matcher = SupplyMatcher()
+        self.assertIs(matcher.alias_index, self.matcher.alias_index)
+
+        SupplyEquivalence.objects.get().add_alias("screw 3.5x55")
+        SupplyMatcher.expire_equivalences()
+
+        with self.assertNumQueries(2):
+            matcher = SupplyMatcher()
+        self.assertIn("screw 3.5x55", matcher.alias_index)
 
     def test_find_match_exact(self):
         candidates = ["Tornillo encefalico 3.5x55mm", "Placa curva"]
@@ -25,20 +128,111 @@ class TestSupplyMatcher(TestCase):
         self.assertIsNotNone(result)
         self.assertEqual(result[1], 100)  # 100% confidence
 
+    def test_find_match_known_equivalence(self):
+        candidates = ["Placa curva", "Tornillo Encefálico 3.5x55mm"]
+        with self.assertNumQueries(0):
+            result = self.matcher.find_match("Tornillo 3.5 x 55", candidates)
+        self.assertEqual(result, ("Tornillo Encefálico 3.5x55mm", 95))
+
+    def test_find_match_index_on_normalized_names(self):
+        candidates = ["placa curva", "tornillo encefalico 3.5x55mm", "pin de steinmann 2.0mm"]
+        with self.assertNumQueries(0):
+            self.assertEqual(self.matcher.find_match_index("tornillo 3.5x55", candidates), (1, 95))
+            self.assertEqual(self.matcher.find_match_index("pin steinmann 2.0mm", candidates)[0], 2)
+            self.assertIsNone(self.matcher.find_match_index("grapa quirurgica", candidates))
+
+    def test_find_match_index_memoized_per_equivalences_version(self):
+        candidates = ["placa curva 4 agujeros", "tornillo encefalico 3.5x55mm"]
+        expected = self.matcher.find_match_index("placa curva de 4 agujeros", candidates)
+
+        with patch.object(SupplyMatcher, '_find_match_index') as mock_find:
+            result = SupplyMatcher().find_match_index("placa curva de 4 agujeros", candidates)
+        mock_find.assert_not_called()
+        self.assertEqual(result, expected)
+        self.assertEqual(result[0], 0)
+
+        SupplyEquivalence.objects.get().add_alias("placa curva 4 agujeros")
+        SupplyMatcher.expire_equivalences()
+        self.assertEqual(SupplyMatcher().match_cache, {})
+
 
 class TestVerificationEngine(TestCase):
 
+    @classmethod
+    def setUpTestData(cls):
+        cls.case = SurgicalCaseFactory()
+        # Crear 3 documentos para el caso en un solo INSERT
+        Document.objects.bulk_create([
+            DocumentFactory.build(surgical_case=cls.case, document_type=document_type)
+            for document_type in (DocumentType.INTERNAL, DocumentType.HOSPITAL, DocumentType.DESCRIPTION)
+        ])
+
     def setUp(self):
         self.engine = VerificationEngine()
 
     def test_verify_case(self):
-        case = SurgicalCaseFactory()
-        # Crear 3 documentos para el caso
-        from .factories import DocumentFactory
-        DocumentFactory(surgical_case=case, document_type=DocumentType.INTERNAL)
-        DocumentFactory(surgical_case=case, document_type=DocumentType.HOSPITAL)
-        DocumentFactory(surgical_case=case, document_type=DocumentType.DESCRIPTION)
-
-        result = self.engine.verify_case(case)
+        self.assertEqual(self.case.documents.count(), 3)
+        result = self.engine.verify_case(self.case)
         self.assertIsNotNone(result)
         self.assertGreaterEqual(result.verification_score, 0)
+
+    def test_verify_case_again_links_case_and_result(self):
+        self.engine.verify_case(self.case)
+        case = SurgicalCase.objects.get(pk=self.case.pk)
+
+        # documentos + insumos (2), update_or_create con su savepoint (4) y la
+        # relectura de overall_status, que calcula PostgreSQL al actualizar (1)
+        with self.assertNumQueries(7):
+            result = self.engine.verify_case(case)
+
+        with self.assertNumQueries(0):
+            self.assertIs(result.surgical_case, case)
+            self.assertIs(case.verification, result)
+        self.assertEqual(
+            result.overall_status,
+            VerificationResult.objects.values_list('overall_status', flat=True).get(pk=result.pk)
+        )
+
+    def test_verify_case_queries_do_not_grow_with_supplies(self):
+        Supply.objects.bulk_create([
+            SupplyFactory.build(document=document)
+            for document in self.case.documents.all()
+            for _ in range(3)
+        ])
+
+        # documentos + insumos (2) y el update_or_create del resultado con sus savepoints (6)
+        with self.assertNumQueries(8) as queries:
+            result = self.engine.verify_case(self.case)
+        self.assertNotIn('"extracted_text"', queries.captured_queries[0]['sql'])
+        self.assertEqual(result.traceability_details['total_supplies'], 3)
+
+    def test_verify_cases_upserts_results(self):
+        self.engine.verify_case(self.case)
+        existing = VerificationResult.objects.get(surgical_case=self.case)
+        VerificationResult.objects.filter(pk=existing.pk).update(verification_score=0, discrepancies=[])
+        other_case = SurgicalCaseFactory()
+        DocumentFactory(surgical_case=other_case)
+
+        # casos, documentos, insumos, upsert y relectura de los resultados (más el savepoint)
+        with self.assertNumQueries(7):
+            results = self.engine.verify_cases(SurgicalCase.objects.filter(pk__in=[self.case.pk, other_case.pk]))
+
+        self.assertEqual({result.surgical_case for result in results}, {self.case, other_case})
+        self.assertEqual(VerificationResult.objects.count(), 2)
+        updated = next(result for result in results if result.surgical_case_id == self.case.pk)
+        self.assertEqual(updated.pk, existing.pk)
+        self.assertEqual(updated.verification_score, self.engine.verify_case(self.case).verification_score)
+        self.assertTrue(updated.discrepancies)
+        created = next(result for result in results if result.surgical_case_id == other_case.pk)
+        self.assertTrue(created.requires_review)
+
+    def test_verify_cases_restores_soft_deleted_result(self):
+        self.engine.verify_case(self.case)
+        existing = VerificationResult.objects.get(surgical_case=self.case)
+        existing.delete()
+
+        results = self.engine.verify_cases([self.case])
+
+        self.assertEqual(results[0].pk, existing.pk)
+        self.assertTrue(VerificationResult.objects.filter(pk=existing.pk).exists())
+
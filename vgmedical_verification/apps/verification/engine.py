@@ -2,7 +2,13 @@ from typing import Dict, List, Tuple, Optional
 from rapidfuzz import fuzz, process
 import re
 import logging
+import threading
+import time
 import unicodedata
+from functools import lru_cache
+from operator import attrgetter
+from django.db import transaction
+from django.db.models import Count, Max, Prefetch, prefetch_related_objects
 from django.utils import timezone
 
 from ..document_processor.models import (
@@ -12,6 +18,128 @@ from ..document_processor.models import (
 
 logger = logging.getLogger(__name__)
 
+# Máximo de resultados de find_match_index memorizados por versión de equivalencias
+MATCH_CACHE_MAXSIZE = 16384
+# Cada cuánto se consulta si cambió la tabla de equivalencias (ediciones de otros procesos)
+EQUIVALENCES_RECHECK_SECONDS = 30
+
+# Diacríticos latinos habituales (mismo resultado que NFKD); evita NFKD cuando el nombre queda en ASCII
+ACCENTS_TABLE = str.maketrans(
+    'áàäâãéèëêíìïîóòöôõúùüûñçÁÀÄÂÃÉÈËÊÍÌÏÎÓÒÖÔÕÚÙÜÛÑÇ',
+    'aaaaaeeeeiiiiooooouuuuncAAAAAEEEEIIIIOOOOOUUUUNC'
+)
+
+
+def strip_accents(name: str) -> str:
+    """Quita acentos; equivalente a NFKD sin marcas combinantes"""
+    name = name.translate(ACCENTS_TABLE)
+    if not name.isascii():
+        name = unicodedata.normalize('NFKD', name)
+        name = ''.join([c for c in name if not unicodedata.combining(c)])
+    return name
+
+
+# Normalización de nombres de insumos (patrones compilados una sola vez)
+SUPPLY_INVALID_CHARS_PATTERN = re.compile(r'[^\w\s\d.,x×-]')
+SPACES_PATTERN = re.compile(r'\s+')
+SUPPLY_DIMENSIONS_PATTERNS = (
+    re.compile(r'(\d+)\s*x\s*(\d+)'),
+    re.compile(r'(\d+)\s*×\s*(\d+)'),
+)
+SUPPLY_REPLACEMENTS = {
+    'standard': 'estandar',
+}
+
+
+@lru_cache(maxsize=8192)
+def normalize_supply_name(name: str) -> str:
+    """
+    Normaliza nombre de insumo para comparación, quitando acentos y caracteres especiales.
+    Cacheada: la verificación compara los mismos nombres contra cada candidato.
+    """
+    if not name:
+        return ''
+
+    # Convertir a minúsculas y quitar acentos
+    normalized = strip_accents(name).lower().strip()
+
+    # Remover caracteres especiales y espacios extras
+    normalized = SUPPLY_INVALID_CHARS_PATTERN.sub('', normalized)
+    normalized = SPACES_PATTERN.sub(' ', normalized)
+
+    # Normalizar medidas comunes (3.5 x 55 / 3.5×55 -> 3.5x55)
+    for pattern in SUPPLY_DIMENSIONS_PATTERNS:
+        normalized = pattern.sub(r'\1x\2', normalized)
+
+    # Normalizar palabras comunes
+    for old, new in SUPPLY_REPLACEMENTS.items():
+        normalized = normalized.replace(old, new)
+
+    return normalized.strip()
+
+
+# Normalización de nombres de personas (paciente, doctor)
+PERSON_NAME_TITLES = ('DR.', 'DRA.', 'DR', 'DRA', 'MD', 'M.D.')
+
+
+@lru_cache(maxsize=4096)
+def normalize_person_name(name: str) -> str:
+    """Normaliza nombres para comparación, quitando acentos y títulos comunes"""
+    if not name:
+        return ''
+
+    normalized = strip_accents(name).upper().strip()
+    normalized = SPACES_PATTERN.sub(' ', normalized)
+
+    # Remover títulos comunes
+    for title in PERSON_NAME_TITLES:
+        normalized = normalized.replace(title, '').strip()
+
+    return normalized
+
+
+# Campos básicos comparados entre documentos: (campo, lector sobre Document)
+BASIC_DATA_FIELDS = (
+    ('patient_name', attrgetter('extracted_patient_name')),
+    ('patient_id', attrgetter('extracted_patient_id')),
+    ('date', lambda doc: doc.extracted_date.isoformat() if doc.extracted_date else None),
+    ('city', attrgetter('extracted_city')),
+    ('doctor', attrgetter('extracted_doctor')),
+    ('procedure', attrgetter('extracted_procedure')),
+)
+BASIC_DATA_DOCUMENT_TYPES = (DocumentType.INTERNAL, DocumentType.HOSPITAL, DocumentType.DESCRIPTION)
+
+
+def _non_empty_values_equal(values) -> bool:
+    """True si todos los valores no vacíos son iguales; corta en la primera diferencia"""
+    first = None
+    for value in values:
+        if not value:
+            continue
+        if first is None:
+            first = value
+        elif value != first:
+            return False
+    return True
+
+
+def _unique_non_empty(values) -> set:
+    """Valores distintos no vacíos (para reportar la discrepancia)"""
+    unique_values = set(values)
+    unique_values.discard('')
+    return unique_values
+
+
+# Columnas de Document que la verificación no lee (el texto OCR completo puede ser grande)
+VERIFICATION_DEFERRED_DOCUMENT_FIELDS = ('extracted_text', 'processing_error')
+
+# Campos que escribe cada verificación (los que actualiza el upsert de verify_cases)
+VERIFICATION_RESULT_FIELDS = (
+    'basic_data_match', 'supplies_match', 'traceability_complete', 'requires_review',
+    'basic_data_details', 'supplies_details', 'traceability_details', 'discrepancies',
+    'verification_score', 'processing_time',
+)
+
 
 class VerificationError(Exception):
     """Excepción para errores de verificación"""
@@ -21,19 +149,77 @@ class VerificationError(Exception):
 class SupplyMatcher:
     """Matcher para encontrar equivalencias entre nombres de insumos"""
 
+    # Caché por proceso: (versión de la tabla, equivalencias, índice de alias, resultados de matching)
+    _equivalences_cache = None
+    # time.monotonic() de la última consulta de versión
+    _equivalences_checked_at = float('-inf')
+    # Protege el reemplazo de la caché y las escrituras en los resultados entre hilos
+    _equivalences_lock = threading.Lock()
+
     def __init__(self):
-        self.equivalences = self._load_equivalences()
+        self.equivalences, self.alias_index, self.match_cache = self._get_equivalences()
         self.fuzzy_threshold = 85  # Umbral de similitud para fuzzy matching
 
-    def _load_equivalences(self) -> Dict[str, List[str]]:
+    @classmethod
+    def expire_equivalences(cls):
+        """Fuerza a consultar la versión de la tabla en la próxima construcción"""
+        cls._equivalences_checked_at = float('-inf')
+
+    @classmethod
+    def _equivalences_fresh(cls) -> bool:
+        return (
+            cls._equivalences_cache is not None
+            and time.monotonic() - cls._equivalences_checked_at < EQUIVALENCES_RECHECK_SECONDS
+        )
+
+    @classmethod
+    def _get_equivalences(cls) -> Tuple[Dict[str, List[str]], Dict[str, List[Tuple[str, set]]], Dict]:
+        """
+        Equivalencias, índice de alias y caché de resultados, recargados solo si la
+        tabla cambió desde la última carga (la versión se consulta a lo sumo cada
+        EQUIVALENCES_RECHECK_SECONDS)
+        """
+        if not cls._equivalences_fresh():
+            with cls._equivalences_lock:
+                if not cls._equivalences_fresh():
+                    cls._refresh_equivalences()
+
+        cached = cls._equivalences_cache
+        return cached[1], cached[2], cached[3]
+
+    @classmethod
+    def _refresh_equivalences(cls):
+        """Consulta la versión de la tabla y recarga la caché si cambió (con el lock tomado)"""
+        # Cualquier alta, baja o edición (incluido add_aliases) cambia el total o el último 'modified'
+        version = SupplyEquivalence.objects.aggregate(total=Count('id'), last_modified=Max('modified'))
+        version = (version['total'], version['last_modified'])
+
+        cached = cls._equivalences_cache
+        if cached is None or cached[0] != version:
+            equivalences = cls._load_equivalences()
+            cls._equivalences_cache = (version, equivalences, cls._build_alias_index(equivalences), {})
+        cls._equivalences_checked_at = time.monotonic()
+
+    @staticmethod
+    def _load_equivalences() -> Dict[str, List[str]]:
         """Carga equivalencias desde la base de datos"""
         equivalences = {}
-        for equiv in SupplyEquivalence.objects.all():
-            equivalences[equiv.canonical_name.lower()] = [
-                alias.lower() for alias in equiv.aliases
-            ]
+        # Solo las 2 columnas usadas, sin instanciar modelos y en bloques acotados
+        rows = SupplyEquivalence.objects.values_list('canonical_name', 'aliases').iterator(chunk_size=2000)
+        for canonical_name, aliases in rows:
+            equivalences[canonical_name.lower()] = [alias.lower() for alias in aliases]
         return equivalences
 
+    @staticmethod
+    def _build_alias_index(equivalences: Dict[str, List[str]]) -> Dict[str, List[Tuple[str, set]]]:
+        """Índice alias -> [(canónico, aliases)] para resolver equivalencias sin recorrerlas todas"""
+        index = {}
+        for canonical, aliases in equivalences.items():
+            alias_set = set(aliases)
+            for alias in alias_set:
+                index.setdefault(alias, []).append((canonical, alias_set))
+        return index
+
     def find_match(self, supply_name: str, candidate_names: List[str]) -> Optional[Tuple[str, int]]:
         """
         Encuentra la mejor coincidencia para un insumo
@@ -41,83 +227,82 @@ class SupplyMatcher:
         Returns:
             Tuple[str, int]: (nombre_coincidente, score_confianza) o None
         """
-        supply_name_clean = self._normalize_name(supply_name)
+        # Cada candidato se normaliza una sola vez para los 3 pasos
+        match = self.find_match_index(
+            self._normalize_name(supply_name),
+            [self._normalize_name(name) for name in candidate_names]
+        )
 
+        if match:
+            index, confidence = match
+            return (candidate_names[index], confidence)
+
+        return None
+
+    def find_match_index(self, supply_name_clean: str, candidates_clean: List[str]) -> Optional[Tuple[int, int]]:
+        """
+        Igual que find_match, sobre nombres ya normalizados. Los resultados se memorizan
+        mientras no cambien las equivalencias (re-verificaciones, insumos repetidos)
+
+        Returns:
+            Tuple[int, int]: (índice_candidato, score_confianza) o None
+        """
+        # Candidatos en su orden original: el índice devuelto depende de él
+        key = (supply_name_clean, tuple(candidates_clean), self.fuzzy_threshold)
+        try:
+            return self.match_cache[key]
+        except KeyError:
+            pass
+
+        match = self._find_match_index(supply_name_clean, candidates_clean)
+        with self._equivalences_lock:
+            if len(self.match_cache) >= MATCH_CACHE_MAXSIZE:
+                self.match_cache.clear()
+            self.match_cache[key] = match
+        return match
+
+    def _find_match_index(self, supply_name_clean: str, candidates_clean: List[str]) -> Optional[Tuple[int, int]]:
+        """Búsqueda exacta, por equivalencias y fuzzy, en ese orden"""
         # 1. Búsqueda exacta
-        for candidate in candidate_names:
-            if supply_name_clean == self._normalize_name(candidate):
-                return (candidate, 100)
+        if supply_name_clean in candidates_clean:
+            return (candidates_clean.index(supply_name_clean), 100)
 
         # 2. Búsqueda por equivalencias conocidas
-        for canonical, aliases in self.equivalences.items():
-            if supply_name_clean in aliases:
-                for candidate in candidate_names:
-                    candidate_clean = self._normalize_name(candidate)
-                    if candidate_clean == canonical or candidate_clean in aliases:
-                        return (candidate, 95)
-
-        # 3. Fuzzy matching
+        for canonical, aliases in self.alias_index.get(supply_name_clean, ()):
+            for index, candidate_clean in enumerate(candidates_clean):
+                if candidate_clean == canonical or candidate_clean in aliases:
+                    return (index, 95)
+
+        # 3. Fuzzy matching (extractOne devuelve el índice del candidato)
         best_match = process.extractOne(
             supply_name_clean,
-            [self._normalize_name(name) for name in candidate_names],
-            scorer=fuzz.token_sort_ratio
+            candidates_clean,
+            scorer=fuzz.token_sort_ratio,
+            score_cutoff=self.fuzzy_threshold
         )
 
-        if best_match and best_match[1] >= self.fuzzy_threshold:
-            # Encontrar el nombre original
-            for candidate in candidate_names:
-                if self._normalize_name(candidate) == best_match[0]:
-                    return (candidate, best_match[1])
+        if best_match:
+            return (best_match[2], best_match[1])
 
         return None
 
     def _normalize_name(self, name: str) -> str:
         """Normaliza nombre de insumo para comparación, quitando acentos y caracteres especiales"""
-        if not name:
-            return ''
-
-        # Convertir a minúsculas y quitar acentos
-        normalized = unicodedata.normalize('NFKD', name)
-        normalized = ''.join([c for c in normalized if not unicodedata.combining(c)])
-        normalized = normalized.lower().strip()
-
-        # Remover caracteres especiales y espacios extras
-        normalized = re.sub(r'[^\w\s\d.,x×-]', '', normalized)
-        normalized = re.sub(r'\s+', ' ', normalized)
-
-        # Normalizar medidas comunes
-        normalized = re.sub(r'(\d+)\s*x\s*(\d+)', r'\1x\2', normalized)
-        normalized = re.sub(r'(\d+)\s*×\s*(\d+)', r'\1x\2', normalized)
-        normalized = re.sub(r'mm', 'mm', normalized)
-        normalized = re.sub(r'cm', 'cm', normalized)
-
-        # Normalizar palabras comunes
-        replacements = {
-            'tornillo': 'tornillo',
-            'placa': 'placa',
-            'clavo': 'clavo',
-            'encefalico': 'encefalico',
-            'estandar': 'estandar',
-            'standard': 'estandar'
-        }
-
-        for old, new in replacements.items():
-            normalized = normalized.replace(old, new)
-
-        return normalized.strip()
+        return normalize_supply_name(name)
 
 
 class BasicDataVerifier:
     """Verificador de datos básicos entre documentos"""
 
-    def verify_case(self, case: SurgicalCase) -> Dict:
+    def verify_case(self, case: SurgicalCase, documents: Optional[List[Document]] = None) -> Dict:
         """
         Verifica consistencia de datos básicos entre los 3 documentos
 
         Returns:
             Dict con resultados de verificación
         """
-        documents = case.documents.all()
+        if documents is None:
+            documents = list(case.documents.all())
 
         if len(documents) != 3:
             return {
@@ -126,26 +311,20 @@ class BasicDataVerifier:
                 'details': {}
             }
 
-        # Organizar documentos por tipo
-        doc_data = {}
-        for doc in documents:
-            doc_data[doc.document_type] = {
-                'patient_name': doc.extracted_patient_name,
-                'patient_id': doc.extracted_patient_id,
-                'date': doc.extracted_date.isoformat() if doc.extracted_date else None,
-                'city': doc.extracted_city,
-                'doctor': doc.extracted_doctor,
-                'procedure': doc.extracted_procedure
-            }
+        # Organizar documentos por tipo (orden fijo: interno, hospital, descripción)
+        docs_by_type = {doc.document_type: doc for doc in documents}
+        ordered_docs = [
+            (doc_type, docs_by_type[doc_type])
+            for doc_type in BASIC_DATA_DOCUMENT_TYPES
+            if doc_type in docs_by_type
+        ]
 
-        # Verificar cada campo
+        # Verificar cada campo con sus valores por tipo de documento
         results = {
-            'patient_name': self._verify_field('patient_name', doc_data),
-            'patient_id': self._verify_field('patient_id', doc_data),
-            'date': self._verify_field('date', doc_data),
-            'city': self._verify_field('city', doc_data),
-            'doctor': self._verify_field('doctor', doc_data),
-            'procedure': self._verify_field('procedure', doc_data)
+            field_name: self._verify_field(
+                field_name, {doc_type: getter(doc) for doc_type, doc in ordered_docs}
+            )
+            for field_name, getter in BASIC_DATA_FIELDS
         }
 
         # Calcular match general
@@ -164,14 +343,8 @@ class BasicDataVerifier:
             ]
         }
 
-    def _verify_field(self, field_name: str, doc_data: Dict) -> Dict:
-        """Verifica un campo específico entre los 3 documentos"""
-        values = {}
-
-        for doc_type in [DocumentType.INTERNAL, DocumentType.HOSPITAL, DocumentType.DESCRIPTION]:
-            if doc_type in doc_data:
-                values[doc_type] = doc_data[doc_type].get(field_name, '')
-
+    def _verify_field(self, field_name: str, values: Dict) -> Dict:
+        """Verifica un campo específico entre los 3 documentos (valores por tipo de documento)"""
         if len(values) < 3:
             return {
                 'match': False,
@@ -180,42 +353,29 @@ class BasicDataVerifier:
             }
 
         # Verificación específica por tipo de campo
-        if field_name in ['patient_name', 'doctor']:
-            return self._verify_name_field(field_name, values)
-        elif field_name == 'patient_id':
-            return self._verify_id_field(values)
-        elif field_name == 'date':
-            return self._verify_date_field(values)
-        elif field_name in ['city', 'procedure']:
-            return self._verify_text_field(field_name, values)
-
-        return {'match': False, 'discrepancy': f'Tipo de campo desconocido: {field_name}'}
+        verifier = self.FIELD_VERIFIERS.get(field_name)
+        if verifier is None:
+            return {'match': False, 'discrepancy': f'Tipo de campo desconocido: {field_name}'}
+        return verifier(self, field_name, values)
 
     def _verify_name_field(self, field_name: str, values: Dict) -> Dict:
         """Verifica campos de nombres (paciente, doctor)"""
-        normalized_values = {}
-
-        for doc_type, value in values.items():
-            if value:
-                # Normalizar nombres para comparación
-                normalized = self._normalize_name(value)
-                normalized_values[doc_type] = normalized
-            else:
-                normalized_values[doc_type] = ''
+        # Normalizar nombres para comparación
+        normalized_values = [self._normalize_name(value) if value else '' for value in values.values()]
 
-        # Verificar si todos son similares
-        unique_values = set(normalized_values.values())
-        unique_values.discard('')  # Remover valores vacíos
-
-        if len(unique_values) <= 1:
+        # Caso esperado: todos iguales (ignorando vacíos), sin construir el conjunto
+        if _non_empty_values_equal(normalized_values):
             return {'match': True, 'values': values}
 
-        # Usar fuzzy matching para nombres similares
+        unique_values = _unique_non_empty(normalized_values)
+
+        # Usar fuzzy matching para nombres similares; con score_cutoff RapidFuzz
+        # devuelve 0 apenas descarta el par, sin calcular el score completo
         similarity_threshold = 85
-        base_name = list(unique_values)[0]
+        base_name, *other_names = unique_values
 
-        for name in unique_values:
-            if fuzz.ratio(base_name, name) < similarity_threshold:
+        for name in other_names:
+            if not fuzz.ratio(base_name, name, score_cutoff=similarity_threshold):
                 return {
                     'match': False,
                     'discrepancy': f'Nombres diferentes en {field_name}: {list(unique_values)}',
@@ -226,65 +386,35 @@ class BasicDataVerifier:
 
     def _normalize_name(self, name: str) -> str:
         """Normaliza nombres para comparación, quitando acentos"""
-        if not name:
-            return ''
-
-        normalized = unicodedata.normalize('NFKD', name)
-        normalized = ''.join([c for c in normalized if not unicodedata.combining(c)])
-        normalized = normalized.upper().strip()
-        normalized = re.sub(r'\s+', ' ', normalized)
-
-        # Remover títulos comunes
-        titles = ['DR.', 'DRA.', 'DR', 'DRA', 'MD', 'M.D.']
-        for title in titles:
-            normalized = normalized.replace(title, '').strip()
-
-        return normalized
+        return normalize_person_name(name)
 
     def _verify_id_field(self, values: Dict) -> Dict:
         """Verifica campo de identificación"""
-        # Limpiar y normalizar IDs
-        normalized_ids = {}
-
-        for doc_type, value in values.items():
-            if value:
-                # Remover puntos, guiones, espacios
-                clean_id = re.sub(r'[^\d]', '', str(value))
-                normalized_ids[doc_type] = clean_id
-            else:
-                normalized_ids[doc_type] = ''
-
-        unique_ids = set(normalized_ids.values())
-        unique_ids.discard('')
+        # Limpiar y normalizar IDs: remover puntos, guiones, espacios (isdecimal equivale a \d en str)
+        normalized_ids = [
+            ''.join(filter(str.isdecimal, str(value))) if value else ''
+            for value in values.values()
+        ]
 
-        if len(unique_ids) <= 1:
+        if _non_empty_values_equal(normalized_ids):
             return {'match': True, 'values': values}
         else:
             return {
                 'match': False,
-                'discrepancy': f'IDs diferentes: {list(unique_ids)}',
+                'discrepancy': f'IDs diferentes: {list(_unique_non_empty(normalized_ids))}',
                 'values': values
             }
 
     def _verify_date_field(self, values: Dict) -> Dict:
         """Verifica campo de fecha"""
-        dates = {}
+        dates = [str(value) if value else '' for value in values.values()]
 
-        for doc_type, value in values.items():
-            if value:
-                dates[doc_type] = str(value)
-            else:
-                dates[doc_type] = ''
-
-        unique_dates = set(dates.values())
-        unique_dates.discard('')
-
-        if len(unique_dates) <= 1:
+        if _non_empty_values_equal(dates):
             return {'match': True, 'values': values}
         else:
             return {
                 'match': False,
-                'discrepancy': f'Fechas diferentes: {list(unique_dates)}',
+                'discrepancy': f'Fechas diferentes: {list(_unique_non_empty(dates))}',
                 'values': values
             }
 
@@ -302,33 +432,32 @@ class BasicDataVerifier:
             return self._verify_procedure_field(values)
 
         # Para ciudad, comparación más estricta
-        normalized_values = set()
-        for value in values.values():
-            if value:
-                normalized_values.add(value.upper().strip())
+        # (un valor con solo espacios cuenta como distinto, por eso no se usa _non_empty_values_equal)
+        normalized_values = [value.upper().strip() for value in values.values() if value]
 
-        if len(normalized_values) <= 1:
+        if all(value == normalized_values[0] for value in normalized_values[1:]):
             return {'match': True, 'values': values}
         else:
             return {
                 'match': False,
-                'discrepancy': f'{field_name} diferentes: {list(normalized_values)}',
+                'discrepancy': f'{field_name} diferentes: {list(set(normalized_values))}',
                 'values': values
             }
 
     def _verify_procedure_field(self, values: Dict) -> Dict:
         """Verifica específicamente el campo de procedimiento"""
-        non_empty_values = [v for v in values.values() if v]
+        # Minúsculas una sola vez por valor
+        non_empty_values = [v.lower() for v in values.values() if v]
 
         if len(non_empty_values) < 2:
             return {'match': True, 'values': values}
 
         # Usar fuzzy matching para procedimientos (pueden tener variaciones)
-        base_proc = non_empty_values[0]
+        base_proc, *other_procs = non_empty_values
         similarity_threshold = 70  # Más permisivo para procedimientos
 
-        for proc in non_empty_values[1:]:
-            if fuzz.partial_ratio(base_proc.lower(), proc.lower()) < similarity_threshold:
+        for proc in other_procs:
+            if not fuzz.partial_ratio(base_proc, proc, score_cutoff=similarity_threshold):
                 return {
                     'match': False,
                     'discrepancy': f'Procedimientos muy diferentes',
@@ -337,6 +466,16 @@ class BasicDataVerifier:
 
         return {'match': True, 'values': values}
 
+    # Verificador por campo: (self, field_name, values) -> resultado
+    FIELD_VERIFIERS = {
+        'patient_name': _verify_name_field,
+        'doctor': _verify_name_field,
+        'patient_id': lambda self, field_name, values: self._verify_id_field(values),
+        'date': lambda self, field_name, values: self._verify_date_field(values),
+        'city': _verify_text_field,
+        'procedure': _verify_text_field,
+    }
+
 
 class SupplyVerifier:
     """Verificador de insumos entre documentos"""
@@ -344,14 +483,15 @@ class SupplyVerifier:
     def __init__(self):
         self.matcher = SupplyMatcher()
 
-    def verify_supplies(self, case: SurgicalCase) -> Dict:
+    def verify_supplies(self, case: SurgicalCase, documents: Optional[List[Document]] = None) -> Dict:
         """
         Verifica consistencia de insumos entre los 3 documentos
 
         Returns:
             Dict con resultados de verificación de insumos
         """
-        documents = case.documents.all()
+        if documents is None:
+            documents = case.documents.prefetch_related('supplies')
 
         # Obtener insumos por documento
         supplies_by_doc = {}
@@ -371,6 +511,10 @@ class SupplyVerifier:
         hospital_supplies = supplies_by_doc.get(DocumentType.HOSPITAL, [])
         description_supplies = supplies_by_doc.get(DocumentType.DESCRIPTION, [])
 
+        # Nombres de los candidatos normalizados una vez por documento, no por insumo interno
+        hospital_names = self._normalized_names(hospital_supplies)
+        description_names = self._normalized_names(description_supplies)
+
         supply_results = []
         total_matches = 0
 
@@ -378,7 +522,9 @@ class SupplyVerifier:
             result = self._verify_single_supply(
                 internal_supply,
                 hospital_supplies,
-                description_supplies
+                description_supplies,
+                hospital_names,
+                description_names
             )
             supply_results.append(result)
             if result['quantity_match'] and result['name_match']:
@@ -401,9 +547,15 @@ class SupplyVerifier:
             ]
         }
 
+    def _normalized_names(self, supplies: List[Supply]) -> List[str]:
+        """Nombres normalizados de los insumos, en el mismo orden"""
+        return [self.matcher._normalize_name(supply.name) for supply in supplies]
+
     def _verify_single_supply(self, internal_supply: Supply,
                               hospital_supplies: List[Supply],
-                              description_supplies: List[Supply]) -> Dict:
+                              description_supplies: List[Supply],
+                              hospital_names: Optional[List[str]] = None,
+                              description_names: Optional[List[str]] = None) -> Dict:
         """Verifica un insumo específico contra los otros documentos"""
 
         result = {
@@ -421,12 +573,12 @@ class SupplyVerifier:
 
         # Buscar coincidencias en reporte de hospital
         hospital_match = self._find_supply_match(
-            internal_supply, hospital_supplies
+            internal_supply, hospital_supplies, hospital_names
         )
 
         # Buscar coincidencias en descripción quirúrgica
         description_match = self._find_supply_match(
-            internal_supply, description_supplies
+            internal_supply, description_supplies, description_names
         )
 
         if hospital_match:
@@ -471,24 +623,25 @@ class SupplyVerifier:
         return result
 
     def _find_supply_match(self, target_supply: Supply,
-                           candidate_supplies: List[Supply]) -> Optional[Dict]:
+                           candidate_supplies: List[Supply],
+                           candidate_names: Optional[List[str]] = None) -> Optional[Dict]:
         """Encuentra la mejor coincidencia para un insumo"""
 
         if not candidate_supplies:
             return None
 
-        candidate_names = [supply.name for supply in candidate_supplies]
-        match = self.matcher.find_match(target_supply.name, candidate_names)
+        if candidate_names is None:
+            candidate_names = self._normalized_names(candidate_supplies)
+        match = self.matcher.find_match_index(
+            self.matcher._normalize_name(target_supply.name), candidate_names
+        )
 
         if match:
-            matched_name, confidence = match
-            # Encontrar el supply object correspondiente
-            for supply in candidate_supplies:
-                if supply.name == matched_name:
-                    return {
-                        'supply': supply,
-                        'confidence': confidence
-                    }
+            index, confidence = match
+            return {
+                'supply': candidate_supplies[index],
+                'confidence': confidence
+            }
 
         return None
 
@@ -496,16 +649,20 @@ class SupplyVerifier:
 class TraceabilityVerifier:
     """Verificador de trazabilidad (etiquetas UDI, REF/LOT)"""
 
-    def verify_traceability(self, case: SurgicalCase) -> Dict:
+    def verify_traceability(self, case: SurgicalCase, documents: Optional[List[Document]] = None) -> Dict:
         """
         Verifica trazabilidad en el reporte interno
 
         Returns:
             Dict con resultados de verificación de trazabilidad
         """
-        try:
-            internal_doc = case.documents.get(document_type=DocumentType.INTERNAL)
-        except Document.DoesNotExist:
+        if documents is None:
+            documents = case.documents.prefetch_related('supplies')
+
+        internal_doc = next(
+            (doc for doc in documents if doc.document_type == DocumentType.INTERNAL), None
+        )
+        if internal_doc is None:
             return {
                 'complete': False,
                 'error': 'No se encontró reporte interno',
@@ -591,46 +748,19 @@ class VerificationEngine:
         start_time = timezone.now()
 
         try:
-            # Verificar datos básicos
-            basic_results = self.basic_verifier.verify_case(case)
-
-            # Verificar insumos
-            supply_results = self.supply_verifier.verify_supplies(case)
-
-            # Verificar trazabilidad
-            traceability_results = self.traceability_verifier.verify_traceability(case)
-
-            # Calcular score general
-            score = self._calculate_overall_score(
-                basic_results, supply_results, traceability_results
-            )
-
-            # Determinar si requiere revisión
-            requires_review = (
-                not basic_results['match'] or
-                not supply_results['match'] or
-                not traceability_results['complete'] or
-                score < 85
-            )
+            # Documentos e insumos se cargan una vez (2 consultas) y se comparten entre verificadores
+            documents = list(case.documents.defer(*VERIFICATION_DEFERRED_DOCUMENT_FIELDS).prefetch_related('supplies'))
 
             # Crear o actualizar resultado
             verification, created = VerificationResult.objects.update_or_create(
                 surgical_case=case,
-                defaults={
-                    'basic_data_match': basic_results['match'],
-                    'supplies_match': supply_results['match'],
-                    'traceability_complete': traceability_results['complete'],
-                    'requires_review': requires_review,
-                    'basic_data_details': basic_results,
-                    'supplies_details': supply_results,
-                    'traceability_details': traceability_results,
-                    'discrepancies': self._compile_discrepancies(
-                        basic_results, supply_results, traceability_results
-                    ),
-                    'verification_score': score,
-                    'processing_time': (timezone.now() - start_time).total_seconds()
-                }
+                defaults=self._verify_documents(case, documents, start_time)
             )
+            if not created:
+                # overall_status lo recalcula PostgreSQL; la instancia conserva el valor anterior
+                verification.refresh_from_db(fields=['overall_status'])
+            # Al actualizar, get() no cachea la relación: enlazar ambos lados sin otra consulta
+            verification.surgical_case = case
 
             return verification
 
@@ -638,6 +768,88 @@ class VerificationEngine:
             logger.error(f"Error en verificación del caso {case.case_number}: {str(e)}")
             raise VerificationError(f"Error en verificación: {str(e)}")
 
+    def verify_cases(self, cases) -> List[VerificationResult]:
+        """
+        Ejecuta la verificación completa de varios casos (reprocesamiento masivo)
+
+        Carga documentos e insumos de todos los casos en 2 consultas y guarda los
+        resultados con un único upsert (INSERT ... ON CONFLICT DO UPDATE).
+
+        Returns:
+            Lista de VerificationResult, uno por caso
+        """
+        cases = list(cases)
+        prefetch_related_objects(cases, Prefetch(
+            'documents',
+            queryset=Document.objects.defer(*VERIFICATION_DEFERRED_DOCUMENT_FIELDS).prefetch_related('supplies')
+        ))
+
+        verifications = []
+        for case in cases:
+            try:
+                defaults = self._verify_documents(case, list(case.documents.all()), timezone.now())
+            except Exception as e:
+                logger.error(f"Error en verificación del caso {case.case_number}: {str(e)}")
+                raise VerificationError(f"Error en verificación: {str(e)}")
+            verifications.append(VerificationResult(surgical_case=case, **defaults))
+
+        with transaction.atomic():
+            VerificationResult.objects.bulk_create(
+                verifications,
+                update_conflicts=True,
+                unique_fields=['surgical_case'],
+                # Re-verificar restaura un resultado eliminado (soft delete) del caso
+                update_fields=[*VERIFICATION_RESULT_FIELDS, 'modified', 'is_removed'],
+            )
+            # En filas ya existentes el id generado en Python no es el de la BD: releer
+            results = {
+                result.surgical_case_id: result
+                for result in VerificationResult.objects.filter(surgical_case__in=cases)
+            }
+
+        for case in cases:
+            results[case.pk].surgical_case = case
+        return [results[case.pk] for case in cases]
+
+    def _verify_documents(self, case: SurgicalCase, documents: List[Document], start_time) -> Dict:
+        """Ejecuta los 3 verificadores sobre los documentos del caso y arma los campos del resultado"""
+        # Verificar datos básicos
+        basic_results = self.basic_verifier.verify_case(case, documents)
+
+        # Verificar insumos
+        supply_results = self.supply_verifier.verify_supplies(case, documents)
+
+        # Verificar trazabilidad
+        traceability_results = self.traceability_verifier.verify_traceability(case, documents)
+
+        # Calcular score general
+        score = self._calculate_overall_score(
+            basic_results, supply_results, traceability_results
+        )
+
+        # Determinar si requiere revisión
+        requires_review = (
+            not basic_results['match'] or
+            not supply_results['match'] or
+            not traceability_results['complete'] or
+            score < 85
+        )
+
+        return {
+            'basic_data_match': basic_results['match'],
+            'supplies_match': supply_results['match'],
+            'traceability_complete': traceability_results['complete'],
+            'requires_review': requires_review,
+            'basic_data_details': basic_results,
+            'supplies_details': supply_results,
+            'traceability_details': traceability_results,
+            'discrepancies': self._compile_discrepancies(
+                basic_results, supply_results, traceability_results
+            ),
+            'verification_score': score,
+            'processing_time': (timezone.now() - start_time).total_seconds()
+        }
+
     def _calculate_overall_score(self, basic_results: Dict,
                                  supply_results: Dict,
                                  traceability_results: Dict) -> float:
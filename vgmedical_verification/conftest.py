@@ -1,14 +1,29 @@
 import pytest
+from django.test.utils import override_settings
 
+from vgmedical_verification.apps.verification.engine import SupplyMatcher
 from vgmedical_verification.users.models import User
 from vgmedical_verification.users.tests.factories import UserFactory
 
 
+@pytest.fixture(autouse=True, scope="session")
+def _session_media_storage(tmp_path_factory):
+    # setUpTestData stores files before the per-test fixture below runs
+    with override_settings(MEDIA_ROOT=str(tmp_path_factory.mktemp("media"))):
+        yield
+
+
 @pytest.fixture(autouse=True)
 def _media_storage(settings, tmpdir) -> None:
     settings.MEDIA_ROOT = tmpdir.strpath
 
 
+@pytest.fixture(autouse=True)
+def _supply_equivalences_recheck() -> None:
+    # Each test rolls back its equivalences: re-check the table version
+    SupplyMatcher.expire_equivalences()
+
+
 @pytest.fixture
 def user(db) -> User:
     return UserFactory()
@@ -1,11 +1,15 @@
 from allauth.account.adapter import get_adapter
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.db import transaction
 from rest_framework import serializers
 
 from vgmedical_verification.users.api.serializers.user import UserSerializer
 
 User = get_user_model()
 
+EMAIL_TAKEN_MESSAGE = "A user is already registered with this e-mail address."
+
 
 class RegisterSerializer(UserSerializer):
     password1 = serializers.CharField(write_only=True)
@@ -18,6 +22,9 @@ class RegisterSerializer(UserSerializer):
             "password1",
             "password2",
         )
+        # validate_email already checks case-insensitively:
+        # skip the exact-match UniqueValidator query
+        extra_kwargs = {"email": {"validators": []}}
 
     def validate(self, data):
         if not data.get("email"):
@@ -40,16 +47,22 @@ class RegisterSerializer(UserSerializer):
         if email:
             email = email.lower()
             email = get_adapter().clean_email(email)
-            if User.objects.filter(email=email).exists():
-                ms = "A user is already registered with this e-mail address."
+            # normalize_email only lowercases the domain:
+            # stored addresses may keep mixed case
+            if User.objects.filter(email__iexact=email).exists():
                 raise serializers.ValidationError(
-                    ms,
+                    EMAIL_TAKEN_MESSAGE,
                 )
         return email
 
     def create(self, validated_data):
-        password = validated_data.pop("password")
-        user = User.objects.create(**validated_data)
-        user.set_password(password)
-        user.save()
-        return user
+        # create_user hashes the password before saving: a single INSERT
+        try:
+            with transaction.atomic():
+                return User.objects.create_user(**validated_data)
+        except IntegrityError:
+            # Registered concurrently after validate_email (same lowercased email):
+            # the unique constraint rejects the INSERT
+            raise serializers.ValidationError(
+                {"email": [EMAIL_TAKEN_MESSAGE]},
+            ) from None
@@ -15,7 +15,10 @@ class UserViewSet(RetrieveModelMixin, ListModelMixin, UpdateModelMixin, GenericV
     queryset = User.objects.all()
 
     def get_queryset(self, *args, **kwargs):
-        return self.queryset.filter(id=self.request.user.id)
+        # Only the serialized columns: skips the password hash and unused auth fields
+        return self.queryset.only(*UserSerializer.Meta.fields).filter(
+            id=self.request.user.id,
+        )
 
     @action(detail=False)
     def me(self, request):
@@ -5,6 +5,7 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.db.models import CharField
 from django.db.models import EmailField
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 
 from .managers import UserManager
@@ -25,5 +26,11 @@ class User(AbstractUser):
 
     objects: ClassVar[UserManager] = UserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # email__iexact compiles to UPPER(email) = UPPER(%s) on PostgreSQL
+            models.Index(Upper("email"), name="users_user_email_upper_idx"),
+        ]
+
     def __str__(self):
         return f"{self.full_name} - {self.email}"
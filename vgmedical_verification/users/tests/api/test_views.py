@@ -1,8 +1,11 @@
 import pytest
+from rest_framework import serializers
 from rest_framework.test import APIRequestFactory
 
+from vgmedical_verification.users.api.serializers.register import RegisterSerializer
 from vgmedical_verification.users.api.views.user import UserViewSet
 from vgmedical_verification.users.models import User
+from vgmedical_verification.users.tests.factories import UserFactory
 
 
 class TestUserViewSet:
@@ -19,6 +22,21 @@ class TestUserViewSet:
 
         assert user in view.get_queryset()
 
+    def test_get_queryset_loads_only_serialized_fields(
+        self,
+        user: User,
+        api_rf: APIRequestFactory,
+    ):
+        view = UserViewSet()
+        request = api_rf.get("/fake-url/")
+        request.user = user
+
+        view.request = request
+
+        instance = view.get_queryset().get()
+        assert "password" in instance.get_deferred_fields()
+        assert "email" not in instance.get_deferred_fields()
+
     def test_me(self, user: User, api_rf: APIRequestFactory):
         view = UserViewSet()
         request = api_rf.get("/fake-url/")
@@ -33,3 +51,55 @@ class TestUserViewSet:
             "full_name": user.full_name,
             "email": user.email,
         }
+
+
+class TestRegisterSerializer:
+    def test_validate_email_rejects_existing_email_any_case(self, db):
+        UserFactory(email="Jane.Doe@example.com")
+        serializer = RegisterSerializer(
+            data={
+                "email": "JANE.DOE@EXAMPLE.COM",
+                "full_name": "Jane Doe",
+                "password1": "a-Strong-pass-123",
+                "password2": "a-Strong-pass-123",
+            },
+        )
+
+        assert not serializer.is_valid()
+        assert "email" in serializer.errors
+
+    def test_create_saves_user_with_hashed_password_in_one_insert(
+        self,
+        db,
+        django_assert_num_queries,
+    ):
+        serializer = RegisterSerializer(
+            data={
+                "email": "john.doe@example.com",
+                "full_name": "John Doe",
+                "password1": "a-Strong-pass-123",
+                "password2": "a-Strong-pass-123",
+            },
+        )
+        assert serializer.is_valid(), serializer.errors
+
+        # INSERT inside a savepoint
+        with django_assert_num_queries(3):
+            user = serializer.save()
+
+        user.refresh_from_db()
+        assert user.check_password("a-Strong-pass-123")
+        assert user.full_name == "John Doe"
+
+    def test_create_reports_email_registered_concurrently(self, db):
+        UserFactory(email="jane.doe@example.com")
+        serializer = RegisterSerializer()
+
+        # validate_email already passed; the unique constraint catches the duplicate
+        with pytest.raises(serializers.ValidationError) as excinfo:
+            serializer.create(
+                {"email": "jane.doe@example.com", "full_name": "Jane", "password": "x"},
+            )
+
+        assert "email" in excinfo.value.detail
+        assert User.objects.count() == 1